@@ -0,0 +1,162 @@
+"""
+Entailment benchmark on generated knights-and-knaves puzzles.
+
+For each puzzle size, asks every backend whether the knowledge base
+entails each inhabitant being a knight or a knave, and records wall time,
+models visited and peak traced memory. For the enumerating backends,
+"visited" counts models; for the knowledge base it counts CDCL decisions.
+
+Usage: python benchmark.py [--sizes 2 4 6 ...] [--output results.csv]
+"""
+
+import argparse
+import csv
+import time
+import tracemalloc
+
+import compiled
+import logic
+from generator import generate
+from knowledge import KnowledgeBase
+
+
+class Counted(logic.Sentence):
+    """Sentence wrapper counting how many models it is evaluated in."""
+
+    def __init__(self, sentence):
+        self.sentence = sentence
+        self.count = 0
+
+    def evaluate(self, model):
+        self.count += 1
+        return self.sentence.evaluate(model)
+
+    def formula(self):
+        return self.sentence.formula()
+
+    def symbols(self):
+        return self.sentence.symbols()
+
+
+def run_model_check(knowledge, queries):
+    """Answers queries with `logic.model_check`."""
+    counted = Counted(knowledge)
+    answers = [logic.model_check(counted, query) for query in queries]
+    return answers, counted.count
+
+
+def run_compiled(knowledge, queries):
+    """Answers queries with `compiled.model_check`."""
+    stats = {"models": 0}
+    answers = [compiled.model_check(knowledge, query, stats)
+               for query in queries]
+    return answers, stats["models"]
+
+
+def run_knowledge_base(knowledge, queries):
+    """Answers queries with one incremental `KnowledgeBase`."""
+    kb = KnowledgeBase()
+    kb.tell(knowledge)
+    answers = [kb.ask(query) for query in queries]
+    return answers, kb.stats["decisions"]
+
+
+BACKENDS = {
+    "model_check": run_model_check,
+    "compiled": run_compiled,
+    "knowledge": run_knowledge_base
+}
+
+
+def measure(backend, knowledge, queries):
+    """
+    Runs `backend` twice: once for time, then under tracemalloc for memory.
+    Returns answers, seconds, models visited and peak KiB.
+    """
+    start = time.perf_counter()
+    answers, visited = BACKENDS[backend](knowledge, queries)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    BACKENDS[backend](knowledge, queries)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return answers, seconds, visited, peak / 1024
+
+
+# Columns of the CSV output, one row per size and backend
+FIELDS = ["n", "backend", "seconds", "visited", "peak_kib"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[2, 3, 4, 5, 6, 7, 8, 10, 15, 20, 40])
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument("--statements", type=int, default=1)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-enumerate", type=int, default=16,
+                        help="largest symbol count for model_check")
+    parser.add_argument("--max-compiled", type=int, default=20,
+                        help="largest symbol count for compiled")
+    parser.add_argument("--output", help="write results to a CSV file")
+    args = parser.parse_args()
+
+    limits = {
+        "model_check": args.max_enumerate,
+        "compiled": args.max_compiled,
+        "knowledge": None
+    }
+
+    rows = []
+    print(f"{'n':>4} {'backend':<12} {'seconds':>10} "
+          f"{'visited':>12} {'peak KiB':>10}")
+    for n in args.sizes:
+        for backend, limit in limits.items():
+            if limit is not None and 2 * n > limit:
+                continue
+            total = {"seconds": 0, "visited": 0, "peak": 0}
+            for trial in range(args.trials):
+                knowledge, people, _ = generate(
+                    n, args.statements, args.depth,
+                    seed=args.seed + 1000 * n + trial
+                )
+                queries = [symbol for pair in people for symbol in pair]
+                answers, seconds, visited, peak = measure(
+                    backend, knowledge, queries
+                )
+
+                # Every backend must agree with the incremental solver
+                if backend != "knowledge":
+                    expected, _ = run_knowledge_base(knowledge, queries)
+                    if answers != expected:
+                        raise Exception(
+                            f"{backend} disagrees on n={n}, trial {trial}"
+                        )
+
+                total["seconds"] += seconds
+                total["visited"] += visited
+                total["peak"] = max(total["peak"], peak)
+
+            row = {
+                "n": n,
+                "backend": backend,
+                "seconds": total["seconds"] / args.trials,
+                "visited": total["visited"] / args.trials,
+                "peak_kib": total["peak"]
+            }
+            rows.append(row)
+            print(f"{n:>4} {backend:<12} {row['seconds']:>10.4f} "
+                  f"{row['visited']:>12.0f} {row['peak_kib']:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Tseitin conversion of logical sentences to CNF, and DIMACS files.
+
+Every compound subformula gets a variable defined to be equivalent to it,
+so the clauses grow linearly with the sentence instead of exponentially
+as when distributing Or over And. Definitions are cached by operator and
+operand literals, so structurally equal subformulas share one variable.
+"""
+
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+from compiled import children
+
+
+class Encoder():
+    """
+    Tseitin encoder from sentences to CNF clauses.
+
+    Variables are numbered from 1 and literals are signed variable numbers,
+    as in DIMACS. `names[var]` is the symbol name of a variable, or None
+    for the variables introduced for subformulas.
+    """
+
+    def __init__(self):
+        self.variables = dict()
+        self.names = [None]
+        self.definitions = dict()
+        self.clauses = []
+        self.constant = None
+
+    def variable(self, name=None):
+        """
+        Returns the variable for symbol `name`, creating it if needed.
+        Without a name, returns a fresh auxiliary variable.
+        """
+        if name is not None and name in self.variables:
+            return self.variables[name]
+        var = len(self.names)
+        if name is not None:
+            self.variables[name] = var
+        self.names.append(name)
+        return var
+
+    def true(self):
+        """Returns a literal that is always true."""
+        if self.constant is None:
+            self.constant = self.variable()
+            self.clauses.append([self.constant])
+        return self.constant
+
+    def conjunction(self, literals):
+        """Returns a literal equivalent to the conjunction of `literals`."""
+        operands = set(literals)
+        if any(-literal in operands for literal in operands):
+            return -self.true()
+        if not operands:
+            return self.true()
+        if len(operands) == 1:
+            return operands.pop()
+
+        key = ("and", frozenset(operands))
+        if key not in self.definitions:
+            var = self.variable()
+            for literal in operands:
+                self.clauses.append([-var, literal])
+            self.clauses.append([var] + [-literal for literal in operands])
+            self.definitions[key] = var
+        return self.definitions[key]
+
+    def disjunction(self, literals):
+        """Returns a literal equivalent to the disjunction of `literals`."""
+        return -self.conjunction([-literal for literal in literals])
+
+    def biconditional(self, left, right):
+        """Returns a literal equivalent to `left` <=> `right`."""
+        if left == right:
+            return self.true()
+        if left == -right:
+            return -self.true()
+
+        # Normalize signs, since (¬a <=> b) is ¬(a <=> b)
+        sign = 1
+        if left < 0:
+            left, sign = -left, -sign
+        if right < 0:
+            right, sign = -right, -sign
+
+        key = ("iff", min(left, right), max(left, right))
+        if key not in self.definitions:
+            var = self.variable()
+            self.clauses.append([-var, -left, right])
+            self.clauses.append([-var, left, -right])
+            self.clauses.append([var, left, right])
+            self.clauses.append([var, -left, -right])
+            self.definitions[key] = var
+        return sign * self.definitions[key]
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the definitions
+        of its subformulas to the clauses.
+        """
+        results = []
+        stack = [(sentence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if isinstance(node, Symbol):
+                results.append(self.variable(node.name))
+                continue
+            operands = children(node)
+            if not expanded:
+                stack.append((node, True))
+                for child in reversed(operands):
+                    stack.append((child, False))
+                continue
+
+            # Operand literals are the last results, in order
+            start = len(results) - len(operands)
+            literals = results[start:]
+            del results[start:]
+
+            if isinstance(node, Not):
+                results.append(-literals[0])
+            elif isinstance(node, And):
+                results.append(self.conjunction(literals))
+            elif isinstance(node, Or):
+                results.append(self.disjunction(literals))
+            elif isinstance(node, Implication):
+                results.append(self.disjunction([-literals[0], literals[1]]))
+            else:
+                results.append(self.biconditional(*literals))
+        return results[0]
+
+    def add(self, sentence):
+        """Adds clauses asserting `sentence`."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            self.clauses.append([
+                -self.literal(sentence.antecedent),
+                self.literal(sentence.consequent)
+            ])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            self.clauses.append([-left, right])
+            self.clauses.append([left, -right])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+
+def write_dimacs(filename, clauses, names=None):
+    """
+    Writes `clauses` to `filename` in DIMACS CNF format.
+    `names[var]`, if given, is written as a comment for each named variable.
+    """
+    count = max((abs(literal) for clause in clauses for literal in clause),
+                default=0)
+    if names is not None:
+        count = max(count, len(names) - 1)
+    with open(filename, "w") as f:
+        if names is not None:
+            for var, name in enumerate(names):
+                if name is not None:
+                    f.write(f"c symbol {var} {name}\n")
+        f.write(f"p cnf {count} {len(clauses)}\n")
+        for clause in clauses:
+            f.write(" ".join(str(literal) for literal in clause) + " 0\n")
+
+
+def read_dimacs(filename):
+    """
+    Reads a DIMACS CNF file.
+    Returns a list of clauses, and a list mapping variables to symbol names
+    (None for variables without a name).
+    """
+    clauses = []
+    names = dict()
+    count = 0
+    clause = []
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("c"):
+                parts = line.split(maxsplit=3)
+                if len(parts) == 4 and parts[1] == "symbol":
+                    names[int(parts[2])] = parts[3]
+                continue
+            if line.startswith("%"):
+                break
+            if line.startswith("p"):
+                count = int(line.split()[2])
+                continue
+            for token in line.split():
+                literal = int(token)
+                if literal == 0:
+                    clauses.append(clause)
+                    clause = []
+                else:
+                    clause.append(literal)
+                    count = max(count, abs(literal))
+    if clause:
+        clauses.append(clause)
+    return clauses, [names.get(var) for var in range(count + 1)]
@@ -0,0 +1,212 @@
+"""
+Compiled evaluation of logical sentences.
+
+A `Sentence` tree is flattened into a postfix program over integer symbol
+slots, so evaluating it is a single loop instead of one method call per
+node. The program can also be turned into one Python lambda. Models are
+given as a list indexed by slot, or as an int bitmask whose bit `i` is the
+value of slot `i`.
+"""
+
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+
+# Opcodes of the postfix program
+LOAD = 0
+NOT = 1
+AND = 2
+OR = 3
+IMPLIES = 4
+IFF = 5
+
+
+def children(sentence):
+    """Returns the list of operands of a compound sentence."""
+    if isinstance(sentence, Not):
+        return [sentence.operand]
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    if isinstance(sentence, Or):
+        return sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return [sentence.antecedent, sentence.consequent]
+    if isinstance(sentence, Biconditional):
+        return [sentence.left, sentence.right]
+    raise TypeError(f"unknown sentence type {type(sentence).__name__}")
+
+
+def instruction(sentence):
+    """Returns the (opcode, argument) pair for a compound sentence."""
+    if isinstance(sentence, Not):
+        return (NOT, 0)
+    if isinstance(sentence, And):
+        return (AND, len(sentence.conjuncts))
+    if isinstance(sentence, Or):
+        return (OR, len(sentence.disjuncts))
+    if isinstance(sentence, Implication):
+        return (IMPLIES, 0)
+    if isinstance(sentence, Biconditional):
+        return (IFF, 0)
+    raise TypeError(f"cannot compile {type(sentence).__name__}")
+
+
+def symbol_names(sentence):
+    """Returns the set of symbol names in a sentence, without recursion."""
+    names = set()
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Symbol):
+            names.add(node.name)
+        else:
+            stack.extend(children(node))
+    return names
+
+
+class CompiledSentence():
+    """
+    Postfix program equivalent to a logical sentence.
+
+    `symbols` fixes the slot of each symbol; it defaults to the sentence's
+    own symbols in sorted order. Sentences that are evaluated against the
+    same models should be compiled with the same `symbols`.
+    """
+
+    def __init__(self, sentence, symbols=None):
+        if symbols is None:
+            symbols = sorted(symbol_names(sentence))
+        self.symbols = [
+            symbol.name if isinstance(symbol, Symbol) else symbol
+            for symbol in symbols
+        ]
+        self.slots = {name: slot for slot, name in enumerate(self.symbols)}
+        self.program = self.flatten(sentence)
+
+    def flatten(self, sentence):
+        """Returns the postfix program for `sentence`, in evaluation order."""
+        program = []
+        stack = [(sentence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if isinstance(node, Symbol):
+                try:
+                    program.append((LOAD, self.slots[node.name]))
+                except KeyError:
+                    raise Exception(f"variable {node.name} not in model")
+            elif expanded:
+                program.append(instruction(node))
+            else:
+                stack.append((node, True))
+                for child in reversed(children(node)):
+                    stack.append((child, False))
+        return program
+
+    def encode(self, model):
+        """Converts a name-keyed model into a bitmask."""
+        mask = 0
+        for slot, name in enumerate(self.symbols):
+            if model[name]:
+                mask |= 1 << slot
+        return mask
+
+    def decode(self, mask):
+        """Converts a bitmask into a name-keyed model."""
+        return {
+            name: bool(mask >> slot & 1)
+            for slot, name in enumerate(self.symbols)
+        }
+
+    def evaluate(self, model):
+        """Evaluates the program in a list or bitmask model."""
+        if isinstance(model, int):
+            values = [bool(model >> slot & 1)
+                      for slot in range(len(self.symbols))]
+        else:
+            values = [bool(value) for value in model]
+        stack = []
+        push = stack.append
+        for op, arg in self.program:
+            if op == LOAD:
+                push(values[arg])
+            elif op == NOT:
+                stack[-1] = not stack[-1]
+            elif op == AND:
+                if arg:
+                    operands = stack[-arg:]
+                    del stack[-arg:]
+                    push(False not in operands)
+                else:
+                    push(True)
+            elif op == OR:
+                if arg:
+                    operands = stack[-arg:]
+                    del stack[-arg:]
+                    push(True in operands)
+                else:
+                    push(False)
+            elif op == IMPLIES:
+                consequent = stack.pop()
+                stack[-1] = not stack[-1] or consequent
+            else:
+                right = stack.pop()
+                stack[-1] = stack[-1] == right
+        return stack[0]
+
+    def source(self, bitmask=False):
+        """Returns a Python expression for the program over the model `m`."""
+        stack = []
+        for op, arg in self.program:
+            if op == LOAD:
+                if bitmask:
+                    stack.append(f"(m & {1 << arg})")
+                else:
+                    stack.append(f"m[{arg}]")
+            elif op == NOT:
+                stack[-1] = f"(not {stack[-1]})"
+            elif op == AND or op == OR:
+                if not arg:
+                    stack.append("True" if op == AND else "False")
+                    continue
+                operands = stack[-arg:]
+                del stack[-arg:]
+                joiner = " and " if op == AND else " or "
+                stack.append(f"({joiner.join(operands)})")
+            elif op == IMPLIES:
+                consequent = stack.pop()
+                stack[-1] = f"(not {stack[-1]} or {consequent})"
+            else:
+                right = stack.pop()
+                stack[-1] = f"((not {stack[-1]}) == (not {right}))"
+        return stack[0]
+
+    def function(self, bitmask=False):
+        """
+        Returns a single lambda evaluating the sentence in a list model,
+        or in a bitmask model if `bitmask` is True.
+
+        Python limits how deeply an expression may nest, so very deep
+        sentences should be evaluated with `evaluate` instead.
+        """
+        return eval(f"lambda m: bool({self.source(bitmask)})", {})
+
+
+def model_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, using compiled sentences.
+    If `stats` is a dict, the number of models enumerated is added to
+    `stats["models"]`.
+    """
+    symbols = sorted(symbol_names(knowledge) | symbol_names(query))
+    knowledge = CompiledSentence(knowledge, symbols).function(bitmask=True)
+    query = CompiledSentence(query, symbols).function(bitmask=True)
+
+    # Knowledge base entails query if query holds in every model of it
+    models = 1 << len(symbols)
+    entailed = True
+    for model in range(models):
+        if knowledge(model) and not query(model):
+            models = model + 1
+            entailed = False
+            break
+    if stats is not None:
+        stats["models"] = stats.get("models", 0) + models
+    return entailed
@@ -0,0 +1,79 @@
+"""
+Random knights-and-knaves puzzles.
+
+Each inhabitant is either a knight, who always tells the truth, or a knave,
+who always lies. Inhabitants make random nested statements about who is
+what. Statements are chosen to be consistent with a hidden solution, so
+every generated puzzle has at least one model.
+"""
+
+import random
+import string
+
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+
+
+def inhabitants(n):
+    """Returns the names of `n` inhabitants: A, B, ... and then P26, P27..."""
+    return [
+        string.ascii_uppercase[i] if i < 26 else f"P{i}"
+        for i in range(n)
+    ]
+
+
+def statement(rng, knights, knaves, depth):
+    """Returns a random claim about the inhabitants, nested up to `depth`."""
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(knights if rng.random() < 0.5 else knaves)
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(statement(rng, knights, knaves, depth - 1))
+    if kind == 1:
+        return And(*[statement(rng, knights, knaves, depth - 1)
+                     for _ in range(rng.randint(2, 3))])
+    if kind == 2:
+        return Or(*[statement(rng, knights, knaves, depth - 1)
+                    for _ in range(rng.randint(2, 3))])
+    if kind == 3:
+        return Implication(statement(rng, knights, knaves, depth - 1),
+                           statement(rng, knights, knaves, depth - 1))
+    return Biconditional(statement(rng, knights, knaves, depth - 1),
+                         statement(rng, knights, knaves, depth - 1))
+
+
+def generate(n, statements=1, depth=2, seed=None):
+    """
+    Generates a puzzle with `n` inhabitants, each making `statements`
+    claims nested up to `depth` operators deep.
+
+    Returns the knowledge base, the list of (knight, knave) symbol pairs
+    for each inhabitant, and the hidden solution as a name-keyed model.
+    """
+    rng = random.Random(seed)
+    names = inhabitants(n)
+    knights = [Symbol(f"{name} is a Knight") for name in names]
+    knaves = [Symbol(f"{name} is a Knave") for name in names]
+
+    # Choose who is a knight in the hidden solution
+    solution = dict()
+    for knight, knave in zip(knights, knaves):
+        is_knight = rng.random() < 0.5
+        solution[knight.name] = is_knight
+        solution[knave.name] = not is_knight
+
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+
+        # Everyone is exactly one of a knight or a knave
+        knowledge.add(Or(knight, knave))
+        knowledge.add(Not(And(knight, knave)))
+
+        # Knights say true statements and knaves say false ones
+        for _ in range(statements):
+            claim = statement(rng, knights, knaves, depth)
+            if claim.evaluate(solution) != solution[knight.name]:
+                claim = Not(claim)
+            knowledge.add(Implication(knight, claim))
+            knowledge.add(Implication(knave, Not(claim)))
+
+    return knowledge, list(zip(knights, knaves)), solution
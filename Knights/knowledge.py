@@ -0,0 +1,391 @@
+"""
+Incremental knowledge base for propositional logic.
+
+Sentences are kept as Tseitin CNF clauses over integer variables and checked
+by a conflict-driven clause-learning (CDCL) solver. The solver state
+(learned clauses, watched literals, variable activities and saved phases)
+survives between queries, and each query is answered under assumptions
+instead of by re-solving from scratch.
+"""
+
+import heapq
+
+from logic import And
+from cnf import Encoder, read_dimacs, write_dimacs
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that answers entailment queries incrementally.
+
+    Variables are numbered from 1 and literals are signed variable numbers,
+    as in DIMACS. Sentences are added with `tell` and queried with `ask`.
+    """
+
+    def __init__(self):
+
+        # Tseitin encoder, which owns the variables and the original clauses
+        self.encoder = Encoder()
+
+        # Per-variable assignment, level, reason clause and heuristics
+        self.value = [None]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+
+        # Clauses, and the clauses watching each literal
+        self.clauses = []
+        self.learned = []
+        self.watches = dict()
+
+        # Assignment trail, split into decision levels
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+
+        # Branching heuristic state
+        self.heap = []
+        self.increment = 1.0
+
+        # False once the clauses themselves are unsatisfiable
+        self.consistent = True
+
+        # Sentences already told
+        self.told = set()
+
+        self.stats = {
+            "decisions": 0,
+            "propagations": 0,
+            "conflicts": 0,
+            "learned": 0
+        }
+
+    def variable(self, name=None):
+        """
+        Returns the variable for symbol `name`, creating it if needed.
+        Without a name, returns a fresh auxiliary variable.
+        """
+        var = self.encoder.variable(name)
+        self.grow()
+        return var
+
+    def grow(self):
+        """Extends the solver state to every variable of the encoder."""
+        while len(self.value) < len(self.encoder.names):
+            var = len(self.value)
+            self.value.append(None)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches[var] = []
+            self.watches[-var] = []
+            heapq.heappush(self.heap, (0.0, var))
+
+    def flush(self, start):
+        """Adds the encoder's clauses from index `start` on to the solver."""
+        self.grow()
+        for clause in self.encoder.clauses[start:]:
+            self.attach(clause)
+
+    def literal_value(self, literal):
+        """Returns True, False or None for the current value of `literal`."""
+        value = self.value[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def tell(self, sentence):
+        """Adds `sentence` to the knowledge base."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.tell(conjunct)
+            return
+
+        # Conjuncts told before are already in the clause database
+        key = repr(sentence)
+        if key in self.told:
+            return
+        self.told.add(key)
+        start = len(self.encoder.clauses)
+        self.encoder.add(sentence)
+        self.flush(start)
+
+    def add_clause(self, literals):
+        """
+        Adds a clause of integer literals.
+        Returns False if the knowledge base is now inconsistent.
+        """
+        self.encoder.clauses.append(list(literals))
+        for literal in literals:
+            while abs(literal) >= len(self.encoder.names):
+                self.encoder.variable()
+        self.grow()
+        return self.attach(literals)
+
+    def attach(self, literals):
+        """
+        Adds a clause to the solver's clause database.
+        Returns False if the knowledge base is now inconsistent.
+        """
+        self.backtrack(0)
+        if not self.consistent:
+            return False
+
+        # Drop literals false at level 0, skip satisfied or tautologies
+        clause = []
+        for literal in literals:
+            value = self.literal_value(literal)
+            if value is True or -literal in clause:
+                return True
+            if value is None and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.consistent = False
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            if self.propagate() is not None:
+                self.consistent = False
+        else:
+            self.clauses.append(clause)
+            self.watch(clause)
+        return self.consistent
+
+    def watch(self, clause):
+        """Watches the first two literals of `clause`."""
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def enqueue(self, literal, reason):
+        """Assigns `literal` true at the current decision level."""
+        var = abs(literal)
+        self.value[var] = literal > 0
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Performs unit propagation over the watched literals.
+        Returns a conflicting clause, or None.
+        """
+        while self.qhead < len(self.trail):
+            false_literal = -self.trail[self.qhead]
+            self.qhead += 1
+            self.stats["propagations"] += 1
+
+            watchers = self.watches[false_literal]
+            kept = []
+            for index, clause in enumerate(watchers):
+
+                # Keep the falsified watch in the second position
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if self.literal_value(first) is True:
+                    kept.append(clause)
+                    continue
+
+                # Look for a new literal to watch
+                for k in range(2, len(clause)):
+                    if self.literal_value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+
+                    # Clause is unit or conflicting
+                    kept.append(clause)
+                    if self.literal_value(first) is False:
+                        kept.extend(watchers[index + 1:])
+                        self.watches[false_literal] = kept
+                        return clause
+                    self.enqueue(first, clause)
+            self.watches[false_literal] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives the first-UIP clause from a conflict.
+        Returns the learned clause and the level to backjump to.
+        """
+        seen = set()
+        learned = [None]
+        counter = 0
+        literal = None
+        clause = conflict
+        index = len(self.trail) - 1
+        current = len(self.trail_lim)
+
+        while True:
+
+            # The first literal of a reason clause is the one it implied
+            for other in (clause if literal is None else clause[1:]):
+                var = abs(other)
+                if var not in seen and self.level[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if self.level[var] == current:
+                        counter += 1
+                    else:
+                        learned.append(other)
+
+            # Walk back to the most recent literal involved in the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.reason[abs(literal)]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal from the highest remaining level second
+        best = max(range(1, len(learned)),
+                   key=lambda i: self.level[abs(learned[i])])
+        learned[1], learned[best] = learned[best], learned[1]
+        return learned, self.level[abs(learned[1])]
+
+    def bump(self, var):
+        """Increases the branching activity of `var`."""
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            for other in range(1, len(self.activity)):
+                self.activity[other] *= 1e-100
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[other], other)
+                         for other in range(1, len(self.value))
+                         if self.value[other] is None]
+            heapq.heapify(self.heap)
+        elif self.value[var] is None:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def backtrack(self, level):
+        """Undoes all assignments above decision level `level`."""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            var = abs(literal)
+            self.phase[var] = self.value[var]
+            self.value[var] = None
+            self.reason[var] = None
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def pick(self):
+        """Returns the unassigned variable with the highest activity."""
+        while self.heap:
+            activity, var = heapq.heappop(self.heap)
+            if self.value[var] is None and -activity == self.activity[var]:
+                return var
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Checks if the clauses are satisfiable with all `assumptions` true.
+        On success, the satisfying assignment is available from `model`.
+        """
+        self.backtrack(0)
+        if not self.consistent:
+            return False
+
+        conflicts = 0
+        restart = 100
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats["conflicts"] += 1
+                conflicts += 1
+
+                # A conflict without decisions means no model exists
+                if not self.trail_lim:
+                    self.consistent = False
+                    return False
+
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.learned.append(learned)
+                    self.stats["learned"] += 1
+                    self.watch(learned)
+                    self.enqueue(learned[0], learned)
+                self.increment /= 0.95
+                continue
+
+            # Restart periodically, keeping learned clauses and activities
+            if conflicts >= restart:
+                conflicts = 0
+                restart = int(restart * 1.5)
+                self.backtrack(0)
+                continue
+
+            # Decide the assumptions first, one per decision level
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.literal_value(literal)
+                if value is False:
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    self.enqueue(literal, None)
+                continue
+
+            var = self.pick()
+            if var is None:
+                return True
+            self.stats["decisions"] += 1
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(var if self.phase[var] else -var, None)
+
+    def model(self):
+        """Returns the last satisfying assignment as a name-keyed model."""
+        return {
+            name: bool(self.value[var])
+            for name, var in self.encoder.variables.items()
+        }
+
+    def ask(self, query):
+        """Checks if the knowledge base entails `query`."""
+
+        # Entailed if the knowledge base is unsatisfiable with `query` false
+        start = len(self.encoder.clauses)
+        literal = self.encoder.literal(query)
+        self.flush(start)
+        return not self.solve([-literal])
+
+    def write_dimacs(self, filename, query=None):
+        """
+        Writes the knowledge base to `filename` in DIMACS CNF format.
+        If `query` is given, its negation is added, so the file is
+        unsatisfiable exactly when the knowledge base entails `query`.
+        """
+        clauses = self.encoder.clauses
+        if query is not None:
+            start = len(clauses)
+            literal = self.encoder.literal(query)
+            self.flush(start)
+            clauses = clauses + [[-literal]]
+        write_dimacs(filename, clauses, self.encoder.names)
+
+    @classmethod
+    def read_dimacs(cls, filename):
+        """Returns a knowledge base with the clauses of a DIMACS CNF file."""
+        kb = cls()
+        clauses, names = read_dimacs(filename)
+        for name in names[1:]:
+            kb.encoder.variable(name)
+        for clause in clauses:
+            kb.add_clause(clause)
+        return kb
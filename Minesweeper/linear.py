@@ -0,0 +1,112 @@
+"""
+Linear-algebra deductions for Minesweeper.
+
+Each sentence is a linear equation over 0/1 mine variables: the cells of
+the sentence sum to its count. Equations are kept sparse, as dicts mapping
+cells to integer coefficients. Gauss-Jordan elimination with integer row
+operations combines overlapping sentences into new equations, and bound
+reasoning on every equation finds the cells whose value is forced by the
+smallest and largest values its left side can take.
+"""
+
+from math import gcd
+
+from probability import components
+
+
+def combine(row, count, other, other_count, pivot):
+    """
+    Eliminates `pivot` from `other` using `row`, without fractions.
+    Returns the new equation divided by the gcd of its terms.
+    """
+    a = row[pivot]
+    b = other[pivot]
+    result = dict()
+    for cell in row.keys() | other.keys():
+        value = a * other.get(cell, 0) - b * row.get(cell, 0)
+        if value:
+            result[cell] = value
+    result_count = a * other_count - b * count
+
+    divisor = gcd(result_count, *result.values())
+    if divisor > 1:
+        result = {cell: value // divisor for cell, value in result.items()}
+        result_count //= divisor
+    return result, result_count
+
+
+def eliminate(equations):
+    """
+    Reduces a list of (row, count) equations to reduced row echelon form.
+    Returns the non-zero equations, or None if they are inconsistent.
+    """
+    equations = [(dict(row), count) for row, count in equations]
+    for i in range(len(equations)):
+        row, count = equations[i]
+        if not row:
+            continue
+
+        # Earlier pivots are already eliminated from this row
+        pivot = min(row)
+        for k in range(len(equations)):
+            other, other_count = equations[k]
+            if k != i and pivot in other:
+                equations[k] = combine(row, count, other, other_count, pivot)
+
+    reduced = []
+    for row, count in equations:
+        if row:
+            reduced.append((row, count))
+        elif count:
+            return None
+    return reduced
+
+
+def bounds(row, count):
+    """
+    Returns the (cell, value) pairs forced by one equation.
+
+    The left side ranges from the sum of the negative coefficients to the
+    sum of the positive ones. A cell is forced if giving it the other
+    value would put the count out of the range left by the other cells.
+    """
+    low = sum(value for value in row.values() if value < 0)
+    high = sum(value for value in row.values() if value > 0)
+    forced = []
+    for cell, value in row.items():
+        if value > 0:
+            if high - value < count:
+                forced.append((cell, 1))
+            elif low + value > count:
+                forced.append((cell, 0))
+        else:
+            if low - value > count:
+                forced.append((cell, 1))
+            elif high + value < count:
+                forced.append((cell, 0))
+    return forced
+
+
+def deduce(sentences):
+    """
+    Finds the cells forced to be safe or mines by a list of (cells, count)
+    sentences, taken together.
+
+    Returns a list of safe cells and a list of mine cells. Returns two
+    empty lists if the sentences are inconsistent.
+    """
+    values = dict()
+    for group in components(sentences):
+        equations = [({cell: 1 for cell in cells}, count)
+                     for cells, count in group]
+        reduced = eliminate(equations)
+        if reduced is None:
+            return [], []
+        for row, count in equations + reduced:
+            for cell, value in bounds(row, count):
+                if values.setdefault(cell, value) != value:
+                    return [], []
+
+    safes = [cell for cell, value in values.items() if value == 0]
+    mines = [cell for cell, value in values.items() if value == 1]
+    return safes, mines
@@ -1,5 +1,53 @@
+import functools
 import itertools
 import random
+import time
+
+from array import array
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from linear import deduce
+from probability import mine_probabilities
+
+# Row and column offsets of the 8 neighbours of a cell
+NEIGHBOURS = [
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0), (1, 1)
+]
+
+
+@functools.lru_cache(maxsize=4)
+def neighbour_table(height, width):
+    """
+    Returns one array per direction in NEIGHBOURS, mapping the flat index
+    `i * width + j` of each cell to the flat index of its neighbour in that
+    direction, or to -1 where the neighbour is off the board.
+
+    Tables are cached per board size, so they are built once and shared.
+    """
+    missing = array("i", [-1]) * width
+    tables = []
+    for di, dj in NEIGHBOURS:
+
+        # Columns whose neighbour in this direction is on the board
+        low = max(0, -dj)
+        high = min(width, width - dj)
+
+        table = array("i")
+        for i in range(height):
+            if not 0 <= i + di < height:
+                table.extend(missing)
+                continue
+            start = (i + di) * width + dj
+            table.extend(missing[:low])
+            table.extend(range(start + low, start + high))
+            table.extend(missing[high:])
+        tables.append(table)
+    return tables
 
 
 class Minesweeper():
@@ -12,23 +60,20 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # Place mines on distinct cells, seeded from `random` so that
+        # seeding it still reproduces a game
+        rng = np.random.default_rng(random.getrandbits(64))
+        placed = rng.choice(height * width, size=mines, replace=False)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[placed] = True
+        self.mines = {divmod(cell, width) for cell in placed.tolist()}
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Count the mines in every 3x3 window, less the cell itself
+        padded = np.pad(self.board, 1)
+        windows = sliding_window_view(padded, (3, 3))
+        self.counts = (windows.sum(axis=(2, 3), dtype=np.int8)
+                       - self.board)
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -50,7 +95,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +103,8 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        i, j = cell
+        return int(self.counts[i, j])
 
     def won(self):
         """
@@ -135,16 +164,284 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class BitSentence():
+    """
+    Compact logical statement about a Minesweeper game.
+
+    Cells are flat board indices `i * width + j`, stored as the bits of
+    `mask`: bit `k` stands for cell `base + k`, where `base` is the lowest
+    cell in the sentence. Keeping masks relative to their lowest cell keeps
+    them a few rows wide even on huge boards. Bit sentences are immutable
+    and hashable, so marking a cell returns a new sentence. `key` is a
+    plain tuple of the three fields, for fast use in dicts and sets.
+    """
+
+    __slots__ = ("base", "mask", "count", "key", "members")
+
+    def __init__(self, base, mask, count):
+
+        # Shift the mask so that its lowest bit is the lowest cell
+        if not mask & 1:
+            if mask:
+                low = (mask & -mask).bit_length() - 1
+                base += low
+                mask >>= low
+            else:
+                base = 0
+        self.base = base
+        self.mask = mask
+        self.count = count
+        self.key = (base, mask, count)
+        self.members = None
+
+    @classmethod
+    def from_cells(cls, cells, count):
+        """Returns the bit sentence for a collection of flat cell indices."""
+        base = min(cells, default=0)
+        mask = 0
+        for cell in cells:
+            mask |= 1 << (cell - base)
+        return cls(base, mask, count)
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __contains__(self, cell):
+        offset = cell - self.base
+        return offset >= 0 and self.mask >> offset & 1 == 1
+
+    def __str__(self):
+        return f"{set(self.cells())} = {self.count}"
+
+    def cells(self):
+        """Returns the list of flat cell indices in the sentence."""
+        if self.members is None:
+            self.members = []
+            mask = self.mask
+            while mask:
+                low = mask & -mask
+                self.members.append(self.base + low.bit_length() - 1)
+                mask ^= low
+        return self.members
+
+    def known_mines(self):
+        """Returns the cells known to be mines."""
+        if self.mask.bit_count() == self.count:
+            return self.cells()
+        return []
+
+    def known_safes(self):
+        """Returns the cells known to be safe."""
+        if self.count == 0:
+            return self.cells()
+        return []
+
+    def difference(self, other):
+        """Returns the sentence for this sentence's cells minus `other`'s."""
+        shift = other.base - self.base
+        if shift >= 0:
+            mask = self.mask & ~(other.mask << shift)
+        else:
+            mask = self.mask & ~(other.mask >> -shift)
+        return BitSentence(self.base, mask, self.count - other.count)
+
+    def without(self, cell, mine):
+        """Returns the sentence with `cell` removed as a mine or safe cell."""
+        mask = self.mask & ~(1 << (cell - self.base))
+        sentence = BitSentence(self.base, mask, self.count - mine)
+        if self.members is not None:
+            sentence.members = [other for other in self.members
+                                if other != cell]
+        return sentence
+
+
+class KnowledgeBase():
+    """
+    Indexed set of bit sentences about a Minesweeper game.
+
+    Each sentence lives in a numbered slot. Each cell maps to the slots of
+    the sentences that contain it, so marking a cell only touches those
+    sentences, and the index stays valid when a slot's sentence is
+    replaced. Slots that are filled or changed are put on a worklist until
+    the AI has re-derived conclusions from them.
+
+    If `outside` is a CellPool, cells are removed from it when a sentence
+    first contains them, and put back when no sentence contains them.
+    """
+
+    def __init__(self, outside=None):
+
+        # Sentence in each slot, and the slot of each sentence key
+        self.sentences = dict()
+        self.slots = dict()
+
+        # Slots of the sentences containing each flat cell index
+        self.index = dict()
+
+        # Slots still to be re-derived
+        self.worklist = deque()
+        self.queued = set()
+
+        self.next_slot = 0
+        self.outside = outside
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return sentence.key in self.slots
+
+    def queue(self, slot):
+        """Puts a slot on the worklist."""
+        if slot not in self.queued:
+            self.queued.add(slot)
+            self.worklist.append(slot)
+
+    def add(self, sentence):
+        """
+        Adds a sentence unless it is empty or already known.
+        Returns True if the sentence was added.
+        """
+        if not sentence.mask or sentence.key in self.slots:
+            return False
+        slot = self.next_slot
+        self.next_slot += 1
+        self.sentences[slot] = sentence
+        self.slots[sentence.key] = slot
+        for cell in sentence.cells():
+            slots = self.index.get(cell)
+            if slots is None:
+                self.index[cell] = {slot}
+                if self.outside is not None:
+                    self.outside.remove(cell)
+            else:
+                slots.add(slot)
+        self.queue(slot)
+        return True
+
+    def pop(self):
+        """Returns the next sentence on the worklist, or None."""
+        while self.worklist:
+            slot = self.worklist.popleft()
+            self.queued.discard(slot)
+            if slot in self.sentences:
+                return self.sentences[slot]
+        return None
+
+    def mark(self, cell, mine):
+        """
+        Replaces every sentence containing `cell` with one that has the
+        cell removed, as a mine or as a safe cell, and queues the results.
+        """
+        for slot in self.index.pop(cell, ()):
+            sentence = self.sentences[slot]
+            del self.slots[sentence.key]
+            new_sentence = sentence.without(cell, mine)
+
+            # Drop sentences that became empty or duplicate another
+            if not new_sentence.mask or new_sentence.key in self.slots:
+                del self.sentences[slot]
+                for other in sentence.cells():
+                    slots = self.index.get(other)
+                    if slots is not None:
+                        slots.discard(slot)
+                        if not slots:
+                            del self.index[other]
+                            if self.outside is not None:
+                                self.outside.add(other)
+                continue
+
+            self.sentences[slot] = new_sentence
+            self.slots[new_sentence.key] = slot
+            self.queue(slot)
+
+    def overlapping(self, sentence):
+        """Returns the other sentences sharing at least one cell."""
+        slots = set()
+        for cell in sentence.cells():
+            slots.update(self.index.get(cell, ()))
+        slots.discard(self.slots[sentence.key])
+        return [self.sentences[slot] for slot in slots]
+
+
+class CellPool():
+    """
+    Set of flat cell indices with constant-time add, remove and choice.
+
+    Cells are kept densely packed in `cells`, and `position` maps each
+    cell of the board to its place in `cells`, or -1 if it is not in the
+    pool. Removing a cell moves the last cell into its place.
+    """
+
+    def __init__(self, size, full=False):
+        if full:
+            self.cells = array("i", range(size))
+            self.position = array("i", range(size))
+        else:
+            self.cells = array("i")
+            self.position = array("i", [-1]) * size
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return self.position[cell] >= 0
+
+    def add(self, cell):
+        """Adds a cell, unless it is already in the pool."""
+        if self.position[cell] < 0:
+            self.position[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def remove(self, cell):
+        """Removes a cell, if it is in the pool."""
+        index = self.position[cell]
+        if index < 0:
+            return
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[index] = last
+            self.position[last] = index
+        self.position[cell] = -1
+
+    def peek(self):
+        """Returns the most recently added cell, or None if empty."""
+        return self.cells[-1] if self.cells else None
+
+    def choice(self):
+        """Returns a random cell, or None if empty."""
+        if not self.cells:
+            return None
+        return self.cells[random.randrange(len(self.cells))]
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, linear=False,
+                 debug=False, callback=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
+        self.neighbours = neighbour_table(height, width)
+
+        # Total number of mines, if known, for weighing guesses
+        self.total_mines = mines
+
+        # Whether to combine sentences by elimination after inference
+        self.linear = linear
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -153,8 +450,28 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells neither chosen nor known to be mines, the known safe cells
+        # among them, and the unknown cells in no sentence, as flat indices
+        self.unexplored = CellPool(height * width, full=True)
+        self.pending = CellPool(height * width)
+        self.outside = CellPool(height * width, full=True)
+
+        # Sentences about the game known to be true
+        self.knowledge = KnowledgeBase(self.outside)
+
+        # Print inferred sentences if `debug`, and report events to
+        # `callback(event, details)` if given
+        self.debug = debug
+        self.callback = callback
+
+        self.stats = {
+            "moves": 0,
+            "rounds": 0,
+            "derived": 0,
+            "deduced": 0,
+            "seconds": 0.0,
+            "move_seconds": 0.0
+        }
 
     def mark_mine(self, cell):
         """
@@ -162,8 +479,10 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        index = cell[0] * self.width + cell[1]
+        self.unexplored.remove(index)
+        self.outside.remove(index)
+        self.knowledge.mark(index, mine=True)
 
     def mark_safe(self, cell):
         """
@@ -171,8 +490,11 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        index = cell[0] * self.width + cell[1]
+        if index in self.unexplored:
+            self.pending.add(index)
+        self.outside.remove(index)
+        self.knowledge.mark(index, mine=False)
 
     def add_knowledge(self, cell, count):
         """
@@ -189,113 +511,131 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        start = time.perf_counter()
         self.moves_made.add(cell)
+        index = cell[0] * self.width + cell[1]
+        self.unexplored.remove(index)
+        self.pending.remove(index)
 
         self.mark_safe(cell)
 
+        # Collect neighbours not yet known, discounting known mines
         neighbours = []
-        cellA = (cell[0] - 1, cell[1] - 1)
-        cellB = (cell[0] - 1, cell[1])
-        cellC = (cell[0] - 1, cell[1] + 1)
-        cellD = (cell[0], cell[1] - 1)
-        cellE = (cell[0], cell[1] + 1)
-        cellF = (cell[0] + 1, cell[1] - 1)
-        cellG = (cell[0] + 1, cell[1])
-        cellH = (cell[0] + 1, cell[1] + 1)
-
-        if (cellA[0] in range(8) and cellA[1] in range(8)): 
-            if (cellA in self.mines):
-                count = count - 1
-            elif (cellA not in self.safes):
-                neighbours.append(cellA)
-        
-        if (cellB[0] in range(8) and cellB[1] in range(8)):
-            if (cellB in self.mines):
-                count = count - 1
-            elif (cellB not in self.safes):
-                neighbours.append(cellB)
-
-        if (cellC[0] in range(8) and cellC[1] in range(8)):    
-            if (cellC in self.mines):
-                count = count - 1
-            elif (cellC not in self.safes):
-                neighbours.append(cellC)
-        
-        if (cellD[0] in range(8) and cellD[1] in range(8)):
-            if (cellD in self.mines):
-                count = count - 1
-            elif (cellD not in self.safes):
-                neighbours.append(cellD)
-        
-        if (cellE[0] in range(8) and cellE[1] in range(8)):
-            if (cellE in self.mines):
-                count = count - 1
-            elif (cellE not in self.safes):
-                neighbours.append(cellE)
-        
-        if (cellF[0] in range(8) and cellF[1] in range(8)):
-            if (cellF in self.mines):
-                count = count - 1
-            elif (cellF not in self.safes):
-                neighbours.append(cellF)
-        
-        if (cellG[0] in range(8) and cellG[1] in range(8)):
-            if (cellG in self.mines):
-                count = count - 1
-            elif (cellG not in self.safes):
-                neighbours.append(cellG)
-        
-        if (cellH[0] in range(8) and cellH[1] in range(8)):
-            if (cellH in self.mines):
-                count = count - 1
-            elif (cellH not in self.safes):
-                neighbours.append(cellH)
-        
-        knowledge = Sentence(neighbours, count)
-        self.knowledge.append(knowledge)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
-        
-
-        knowledge_new = True
-
-        while (knowledge_new):
-            knowledge_new = False
-            safes = set()
-            mines = set()
-            
-            for sentence in self.knowledge:
-                safes = safes.union(sentence.known_safes())
-                mines = mines.union(sentence.known_mines())    
-
+        remaining = count
+        for table in self.neighbours:
+            other = table[index]
+            if other < 0:
+                continue
+            neighbour = divmod(other, self.width)
+            if neighbour in self.mines:
+                remaining -= 1
+            elif neighbour not in self.safes:
+                neighbours.append(other)
+
+        self.knowledge.add(BitSentence.from_cells(neighbours, remaining))
+        self.infer()
+        if self.linear:
+            self.deduce()
+
+        elapsed = time.perf_counter() - start
+        self.stats["moves"] += 1
+        self.stats["seconds"] += elapsed
+        self.stats["move_seconds"] = elapsed
+        if self.callback is not None:
+            self.callback("move", {"cell": cell, "count": count,
+                                   "seconds": elapsed})
+
+    def infer(self):
+        """
+        Draws conclusions from the sentences on the knowledge worklist
+        until it is empty.
+
+        A sentence whose cells are all safe or all mines marks them. Any
+        other sentence is compared with the sentences it overlaps: if one's
+        cells are a subset of the other's, their difference is added as a
+        new sentence. Marking cells and adding sentences puts the affected
+        sentences back on the worklist.
+        """
+        while True:
+            sentence = self.knowledge.pop()
+            if sentence is None:
+                return
+            self.stats["rounds"] += 1
+
+            safes = sentence.known_safes()
+            mines = sentence.known_mines()
             if safes:
-                knowledge_changed = True
                 for safe in safes:
-                    self.mark_safe(safe)
+                    self.mark_safe(divmod(safe, self.width))
+                continue
             if mines:
-                knowledge_changed = True
                 for mine in mines:
-                    self.mark_mine(mine)  
-            
-            empty = Sentence(set(), 0)
-            self.knowledge[:] = [x for x in self.knowledge if x != empty]                          
-
-            for sentence_1 in self.knowledge:
-                for sentence_2 in self.knowledge:
+                    self.mark_mine(divmod(mine, self.width))
+                continue
 
-                    if sentence_1.cells == sentence_2.cells:
-                        continue
+            base, mask = sentence.base, sentence.mask
+            for other in self.knowledge.overlapping(sentence):
 
-                    if sentence_1.cells.issubset(sentence_2.cells):
-                        new_sentence_cells = sentence_2.cells - sentence_1.cells
-                        new_sentence_count = sentence_2.count - sentence_1.count
+                # Align the two masks on the lower of the two bases
+                shift = other.base - base
+                if shift >= 0:
+                    low, high = mask, other.mask << shift
+                else:
+                    low, high = mask << -shift, other.mask
+                if low == high:
+                    continue
+                if high & ~low == 0:
+                    subset, superset = other, sentence
+                elif low & ~high == 0:
+                    subset, superset = sentence, other
+                else:
+                    continue
 
-                        new_sentence = Sentence(new_sentence_cells, new_sentence_count)
+                new_sentence = superset.difference(subset)
+                if self.knowledge.add(new_sentence):
+                    self.stats["derived"] += 1
+                    if self.debug or self.callback is not None:
+                        self.derived(new_sentence, subset, superset)
 
-                        if new_sentence not in self.knowledge:
-                            knowledge_changed = True
-                            print('New Inferred Knowledge: ', new_sentence, 'from', sentence_1, ' and ', sentence_2)
-                            self.knowledge.append(new_sentence)
+    def derived(self, sentence, subset, superset):
+        """
+        Reports a sentence inferred from `superset` minus `subset`.
+        """
+        sentence = self.sentence(sentence)
+        subset = self.sentence(subset)
+        superset = self.sentence(superset)
+        if self.debug:
+            print('New Inferred Knowledge: ', sentence, 'from', subset,
+                  ' and ', superset)
+        if self.callback is not None:
+            self.callback("derived", {"sentence": sentence,
+                                      "subset": subset,
+                                      "superset": superset})
+
+    def deduce(self):
+        """
+        Marks the cells forced by all sentences taken together, which the
+        subset rule in `infer` can miss, and infers from the results until
+        no more cells are forced.
+        """
+        while True:
+            safes, mines = deduce([(sentence.cells(), sentence.count)
+                                   for sentence in self.knowledge])
+            if not safes and not mines:
+                return
+            self.stats["deduced"] += len(safes) + len(mines)
+            for safe in safes:
+                self.mark_safe(divmod(safe, self.width))
+            for mine in mines:
+                self.mark_mine(divmod(mine, self.width))
+            self.infer()
+
+    def sentence(self, bits):
+        """
+        Returns the `Sentence` of (i, j) cells equivalent to a bit sentence.
+        """
+        return Sentence([divmod(cell, self.width) for cell in bits.cells()],
+                        bits.count)
 
     def make_safe_move(self):
         """
@@ -306,23 +646,54 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        if (not(self.safes)):
+        cell = self.pending.peek()
+        if cell is None:
             return None
-        for x in self.safes:
-            if x not in self.moves_made:
-                return x
-    
+        return divmod(cell, self.width)
+
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        If the total number of mines is known, chooses the cell least
+        likely to be a mine instead. Returns None if no such cell is left.
         """
-        row = random.choice(range(8))
-        column = random.choice(range(8))
-        if ((row, column) not in self.moves_made and (row, column) not in self.mines):
-            return (row, column)
-        return self.make_random_move()
-        return None
-        
+        if self.total_mines is not None:
+            move = self.least_risky_move()
+            if move is not None:
+                return move
+
+        cell = self.unexplored.choice()
+        if cell is None:
+            return None
+        return divmod(cell, self.width)
+
+    def least_risky_move(self):
+        """
+        Returns the unexplored cell with the lowest probability of being a
+        mine, given the knowledge base and the total number of mines.
+        Returns None if the knowledge is inconsistent with the mine total.
+        """
+        sentences = [(sentence.cells(), sentence.count)
+                     for sentence in self.knowledge]
+        outside = len(self.outside)
+        result = mine_probabilities(sentences, outside,
+                                    self.total_mines - len(self.mines))
+        if result is None:
+            return None
+        probabilities, outside_probability = result
+
+        # Prefer a frontier cell unless cells outside it are safer
+        best = min(probabilities, key=probabilities.get, default=None)
+        if best is not None and (
+            not outside or probabilities[best] <= outside_probability
+        ):
+            return divmod(best, self.width)
+        if not outside:
+            return None
+
+        # Any cell outside the frontier is as good as any other
+        return divmod(self.outside.choice(), self.width)
@@ -0,0 +1,247 @@
+"""
+Exact mine probabilities for Minesweeper guesses.
+
+The frontier (cells that appear in some sentence) is split into
+independent components: two cells are in the same component if a chain of
+sentences links them. Each component's consistent mine assignments are
+counted by mine total with a dynamic program over the cells. The
+components are then combined with the cells outside the frontier, weighing
+every frontier mine total by the number of ways to place the remaining
+mines outside it.
+
+Those numbers of ways are binomial coefficients far too large to compute
+on big boards, so only their ratios are used: each weight is taken in log
+space relative to the largest one, and the counts of each component are
+scaled by its largest count. Probabilities are ratios in which the scales
+cancel.
+"""
+
+from collections import deque
+from math import exp, lgamma
+
+
+def components(sentences):
+    """
+    Splits sentences into groups that share no cells.
+    Returns a list of lists of (cells, count) sentences.
+    """
+    parent = dict()
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for cells, _ in sentences:
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        root = find(cells[0])
+        for cell in cells[1:]:
+            other = find(cell)
+            if other != root:
+                parent[other] = root
+
+    groups = dict()
+    for sentence in sentences:
+        groups.setdefault(find(sentence[0][0]), []).append(sentence)
+    return list(groups.values())
+
+
+def order_cells(sentences):
+    """
+    Returns the cells of a component in breadth-first order along shared
+    sentences, so that each sentence is open over a short stretch.
+    """
+    containing = dict()
+    for index, (cells, _) in enumerate(sentences):
+        for cell in cells:
+            containing.setdefault(cell, []).append(index)
+
+    order = []
+    seen = set()
+    queue = deque([min(containing)])
+    seen.add(queue[0])
+    while queue:
+        cell = queue.popleft()
+        order.append(cell)
+        for index in containing[cell]:
+            for other in sorted(sentences[index][0]):
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+    return order
+
+
+def count_assignments(sentences):
+    """
+    Counts the mine assignments consistent with a component's sentences.
+
+    Returns the component's cells, and a dict mapping each possible number
+    of mines `m` to a pair: the number of assignments with `m` mines, and a
+    list with, for each cell, how many of those assignments make it a mine.
+    """
+    cells = order_cells(sentences)
+    position = {cell: i for i, cell in enumerate(cells)}
+    n = len(cells)
+
+    # For each cell, the sentences containing it and how many of their
+    # cells come after it
+    constraints = [[] for _ in range(n)]
+    spans = []
+    for k, (sentence_cells, _) in enumerate(sentences):
+        positions = sorted(position[cell] for cell in sentence_cells)
+        for j, i in enumerate(positions):
+            constraints[i].append((k, len(positions) - j - 1))
+        spans.append((positions[0], positions[-1]))
+
+    # Sentences partly assigned before each position; together with the
+    # position, their remaining counts determine the rest of the search
+    active = [
+        [k for k, (first, last) in enumerate(spans) if first < i <= last]
+        for i in range(n + 1)
+    ]
+
+    # Walk forward over the cells, collecting at each position the
+    # remaining counts that can occur there and where each value leads
+    counts = [count for _, count in sentences]
+    states = [dict() for _ in range(n + 1)]
+    states[0][()] = None
+    for i in range(n):
+        for key in states[i]:
+            remaining = dict(zip(active[i], key))
+            moves = []
+            for value in (0, 1):
+
+                # Every sentence must still be satisfiable by the later cells
+                after = dict()
+                for k, left in constraints[i]:
+                    after[k] = remaining.get(k, counts[k]) - value
+                    if not 0 <= after[k] <= left:
+                        break
+                else:
+                    following = tuple(
+                        after[k] if k in after else remaining[k]
+                        for k in active[i + 1]
+                    )
+                    states[i + 1].setdefault(following, None)
+                    moves.append((value, following))
+            states[i][key] = moves
+
+    # Then combine the results backward, from the last cell to the first
+    states[n][()] = {0: [1, []]}
+    for i in range(n - 1, -1, -1):
+        for key, moves in states[i].items():
+            result = dict()
+            for value, following in moves:
+                rest = states[i + 1][following]
+                for mines, (ways, cell_counts) in rest.items():
+                    entry = result.get(mines + value)
+                    if entry is None:
+                        entry = result[mines + value] = [0, [0] * (n - i)]
+                    entry[0] += ways
+                    if value:
+                        entry[1][0] += ways
+                    totals = entry[1]
+                    for j, count in enumerate(cell_counts, 1):
+                        totals[j] += count
+            states[i][key] = result
+        states[i + 1] = None
+
+    return cells, states[0][()]
+
+
+def convolve(left, right):
+    """Combines two {mines: ways} distributions of independent parts."""
+    result = dict()
+    for a, x in left.items():
+        for b, y in right.items():
+            result[a + b] = result.get(a + b, 0) + x * y
+    return result
+
+
+def log_comb(n, r):
+    """Returns the natural log of the binomial coefficient C(n, r)."""
+    return lgamma(n + 1) - lgamma(r + 1) - lgamma(n - r + 1)
+
+
+def mine_probabilities(sentences, outside, mines_left):
+    """
+    Computes the probability that each unknown cell is a mine.
+
+    `sentences` is a list of (cells, count) pairs over the frontier cells,
+    `outside` is the number of unknown cells in no sentence, and
+    `mines_left` is the number of mines not yet identified.
+
+    Returns a dict mapping each frontier cell to its probability, and the
+    probability for every cell outside the frontier. Returns None if no
+    assignment is consistent with the sentences and the mine total.
+    """
+    # Assignment counts of each component, scaled by its largest count
+    solved = []
+    for group in components(sentences):
+        cells, counts = count_assignments(group)
+        scale = max(ways for ways, _ in counts.values())
+        solved.append((cells, {
+            mines: (ways / scale, [count / scale for count in cell_counts])
+            for mines, (ways, cell_counts) in counts.items()
+        }))
+    distributions = [
+        {mines: entry[0] for mines, entry in counts.items()}
+        for _, counts in solved
+    ]
+
+    # Distribution of frontier mines over all components
+    total = {0: 1}
+    for distribution in distributions:
+        total = convolve(total, distribution)
+
+    # Ways to place the remaining mines outside the frontier for each
+    # frontier total, relative to the total with the most ways
+    logs = {
+        mines: log_comb(outside, mines_left - mines)
+        for mines in total if 0 <= mines_left - mines <= outside
+    }
+    if not logs:
+        return None
+    top = max(logs.values())
+    weights = {mines: exp(value - top) for mines, value in logs.items()}
+
+    def weight(mines):
+        """Relative ways to place the remaining mines outside."""
+        return weights.get(mines, 0)
+
+    normalizer = sum(ways * weight(mines) for mines, ways in total.items())
+    if normalizer == 0:
+        return None
+
+    probabilities = dict()
+    for index, (cells, counts) in enumerate(solved):
+        others = {0: 1}
+        for other, distribution in enumerate(distributions):
+            if other != index:
+                others = convolve(others, distribution)
+
+        for mines, (_, cell_counts) in counts.items():
+            factor = sum(ways * weight(mines + rest)
+                         for rest, ways in others.items())
+            if not factor:
+                continue
+            for cell, count in zip(cells, cell_counts):
+                probabilities[cell] = (probabilities.get(cell, 0)
+                                       + count * factor)
+
+        for cell in cells:
+            probabilities[cell] = probabilities.get(cell, 0) / normalizer
+
+    # With `rest` mines outside, each outside cell is a mine in a fraction
+    # rest / outside of their placements
+    outside_probability = 0
+    if outside:
+        outside_ways = sum(
+            ways * weight(mines) * (mines_left - mines) / outside
+            for mines, ways in total.items()
+        )
+        outside_probability = outside_ways / normalizer
+
+    return probabilities, outside_probability
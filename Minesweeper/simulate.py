@@ -0,0 +1,121 @@
+"""
+Headless Minesweeper simulator for evaluating MinesweeperAI.
+
+Plays seeded games across a process pool and reports the win rate,
+guesses per game and the latency of `MinesweeperAI.add_knowledge`.
+
+Usage: python simulate.py [--games N] [--height H] [--width W] [--mines M]
+"""
+
+import argparse
+import os
+import random
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def play(height, width, mines, seed, engine=True, linear=False):
+    """
+    Plays one game with the AI, seeded by `seed`.
+    Returns whether the AI won, how many guesses it made, how many moves
+    it made, and the time taken by each call to `add_knowledge`.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width,
+                       mines=mines if engine else None, linear=linear)
+
+    guesses = 0
+    latencies = []
+    safe_cells = height * width - mines
+    while len(ai.moves_made) < safe_cells:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            guesses += 1
+        if game.is_mine(move):
+            return False, guesses, len(ai.moves_made), latencies
+
+        nearby = game.nearby_mines(move)
+        start = time.perf_counter()
+        ai.add_knowledge(move, nearby)
+        latencies.append(time.perf_counter() - start)
+
+    return True, guesses, len(ai.moves_made), latencies
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of sorted `values`."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+def simulate(games, height, width, mines, seed=0, workers=None, engine=True,
+             linear=False):
+    """
+    Plays `games` games with seeds `seed`, `seed + 1`, ... across a pool
+    of `workers` processes. Returns a dict of summary statistics.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [(height, width, mines, seed + i, engine, linear)
+             for i in range(games)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, games // (4 * workers))
+        results = list(executor.map(play, *zip(*tasks), chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    wins = sum(1 for won, _, _, _ in results if won)
+    guesses = sum(guess for _, guess, _, _ in results)
+    moves = sum(move for _, _, move, _ in results)
+    latencies = sorted(
+        latency for _, _, _, game_latencies in results
+        for latency in game_latencies
+    )
+    return {
+        "games": games,
+        "wins": wins,
+        "win_rate": wins / games,
+        "guesses_per_game": guesses / games,
+        "moves_per_game": moves / games,
+        "add_knowledge_p50_ms": 1000 * percentile(latencies, 0.50),
+        "add_knowledge_p99_ms": 1000 * percentile(latencies, 0.99),
+        "seconds": elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--no-engine", action="store_true",
+                        help="guess uniformly instead of by probability")
+    parser.add_argument("--linear", action="store_true",
+                        help="add the linear-algebra deduction stage")
+    args = parser.parse_args()
+
+    stats = simulate(args.games, args.height, args.width, args.mines,
+                     seed=args.seed, workers=args.workers,
+                     engine=not args.no_engine, linear=args.linear)
+
+    print(f"Board: {args.height}x{args.width}, {args.mines} mines")
+    print(f"Games: {stats['games']} in {stats['seconds']:.1f}s")
+    print(f"Win rate: {100 * stats['win_rate']:.1f}%")
+    print(f"Guesses per game: {stats['guesses_per_game']:.2f}")
+    print(f"Moves per game: {stats['moves_per_game']:.1f}")
+    print(f"add_knowledge p50: {stats['add_knowledge_p50_ms']:.3f} ms")
+    print(f"add_knowledge p99: {stats['add_knowledge_p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
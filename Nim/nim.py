@@ -2,6 +2,8 @@ import math
 import random
 import time
 
+import numpy as np
+
 
 class Nim():
 
@@ -72,6 +74,9 @@ class Nim():
 
 class NimAI():
 
+    # Tag written by `save`, so that `load` can tell which class saved a file
+    format = "dict"
+
     def __init__(self, alpha=0.5, epsilon=0.1):
         """
         Initialize AI with an empty Q-learning dictionary,
@@ -86,6 +91,52 @@ class NimAI():
         self.alpha = alpha
         self.epsilon = epsilon
 
+    def save(self, filename):
+        """
+        Save the Q-values and hyperparameters to `filename`, as a
+        compressed NumPy archive.
+        """
+        keys = list(self.q)
+        with open(filename, "wb") as f:
+            np.savez_compressed(
+                f,
+                states=np.array([state for state, _ in keys], dtype=np.int16),
+                actions=np.array([action for _, action in keys],
+                                 dtype=np.int16),
+                values=np.array([self.q[key] for key in keys]),
+                alpha=self.alpha,
+                epsilon=self.epsilon,
+                format=self.format
+            )
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Return the AI saved to `filename` by `save`.
+        """
+        with np.load(filename) as data:
+            cls.check_format(data, filename)
+            ai = cls(alpha=float(data["alpha"]),
+                     epsilon=float(data["epsilon"]))
+            for state, action, value in zip(data["states"].tolist(),
+                                            data["actions"].tolist(),
+                                            data["values"].tolist()):
+                ai.q[tuple(state), tuple(action)] = value
+        return ai
+
+    @classmethod
+    def check_format(cls, data, filename):
+        """
+        Raise a ValueError unless the archive `data`, read from
+        `filename`, was saved by this class.
+        """
+        found = str(data["format"]) if "format" in data else "untagged"
+        if found != cls.format:
+            raise ValueError(
+                f"{filename} is in the {found!r} format, "
+                f"but {cls.__name__} loads the {cls.format!r} format"
+            )
+
     def update(self, old_state, action, new_state, reward):
         """
         Update Q-learning model, given an old state, an action taken
@@ -137,7 +188,10 @@ class NimAI():
         `state`, return 0.
         """
         max_q = -math.inf
-        for action in Nim.available_actions(state):
+        available_actions = Nim.available_actions(state)
+        if not available_actions:
+            return 0
+        for action in available_actions:
             if (tuple(state), action) in self.q:
                 max_q = max(max_q, self.q[(tuple(state), action)])
             else:
@@ -174,12 +228,128 @@ class NimAI():
                 return random.choice(tuple(available_actions))
             else:
                 return best_action
-def train(n):
+
+
+class ArrayNimAI(NimAI):
+
+    format = "array"
+
+    def __init__(self, alpha=0.5, epsilon=0.1, initial=[1, 3, 5, 7]):
+        """
+        Initialize AI with a Q-table stored as a NumPy array, for games
+        starting from the piles `initial`.
+
+        Each state is numbered in mixed radix, with pile `i` as a digit
+        of base `initial[i] + 1`, and each action `(i, j)` has a column.
+        `self.q[s, a]` is the Q-value of action `a` in state `s`, and
+        `self.valid[s, a]` says whether the action is available there.
+        """
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.initial = list(initial)
+
+        # Place value of each pile in the state number
+        self.strides = []
+        states = 1
+        for pile in self.initial:
+            self.strides.append(states)
+            states *= pile + 1
+
+        # Column of each action, and the action of each column
+        self.actions = [
+            (i, j) for i, pile in enumerate(self.initial)
+            for j in range(1, pile + 1)
+        ]
+        self.columns = {action: a for a, action in enumerate(self.actions)}
+
+        self.q = np.zeros((states, len(self.actions)))
+        self.valid = np.zeros((states, len(self.actions)), dtype=bool)
+        for s in range(states):
+            piles = [s // stride % (pile + 1)
+                     for stride, pile in zip(self.strides, self.initial)]
+            for a, (i, j) in enumerate(self.actions):
+                self.valid[s, a] = j <= piles[i]
+
+    def save(self, filename):
+        """
+        Save the Q-table, starting piles and hyperparameters to
+        `filename`, as a compressed NumPy archive.
+        """
+        with open(filename, "wb") as f:
+            np.savez_compressed(f, q=self.q, initial=self.initial,
+                                alpha=self.alpha, epsilon=self.epsilon,
+                                format=self.format)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Return the AI saved to `filename` by `save`.
+        """
+        with np.load(filename) as data:
+            cls.check_format(data, filename)
+            ai = cls(alpha=float(data["alpha"]),
+                     epsilon=float(data["epsilon"]),
+                     initial=data["initial"].tolist())
+            if data["q"].shape != ai.q.shape:
+                raise ValueError("Q-table does not match starting piles")
+            ai.q[:] = data["q"]
+        return ai
+
+    def index(self, state):
+        """
+        Return the row of `self.q` for the piles `state`.
+        """
+        s = 0
+        for i in range(len(state)):
+            s += state[i] * self.strides[i]
+        return s
+
+    def get_q_value(self, state, action):
+        """
+        Return the Q-value for the state `state` and the action `action`.
+        """
+        return self.q[self.index(state), self.columns[action]]
+
+    def update_q_value(self, state, action, old_q, reward, future_rewards):
+        """
+        Update the Q-value for the state `state` and the action `action`,
+        as in `NimAI.update_q_value`.
+        """
+        self.q[self.index(state), self.columns[action]] = (
+            old_q + self.alpha * (reward + future_rewards - old_q)
+        )
+
+    def best_future_reward(self, state):
+        """
+        Return the maximum Q-value of the actions available in `state`,
+        or 0 if there are none.
+        """
+        s = self.index(state)
+        if s == 0:
+            return 0
+        return self.q[s].max(where=self.valid[s], initial=-math.inf)
+
+    def choose_action(self, state, epsilon=True):
+        """
+        Given a state `state`, return an action `(i, j)` to take, as in
+        `NimAI.choose_action`. Ties go to the first action in column
+        order.
+        """
+        s = self.index(state)
+        if epsilon and random.random() < self.epsilon:
+            columns = np.flatnonzero(self.valid[s])
+            return self.actions[columns[random.randrange(len(columns))]]
+        q = np.where(self.valid[s], self.q[s], -math.inf)
+        return self.actions[int(q.argmax())]
+
+
+def train(n, ai=None):
     """
     Train an AI by playing `n` games against itself.
+    Trains `ai` if given, or else a new NimAI.
     """
 
-    player = NimAI()
+    player = NimAI() if ai is None else ai
 
     # Play n games
     for i in range(n):
@@ -233,6 +403,100 @@ def train(n):
     return player
 
 
+def train_batch(n, ai=None, batch=256, interval=1000):
+    """
+    Train an ArrayNimAI by playing `n` games against itself, `batch`
+    games at a time, and print progress every `interval` games.
+
+    All games advance together as arrays: every step chooses one
+    epsilon-greedy action per game, applies it, and makes the same
+    Q-learning updates as `train` for every game at once. When several
+    games update the same state and action in one step, it moves once
+    toward the mean of their targets.
+    """
+    player = ArrayNimAI() if ai is None else ai
+    q, valid = player.q, player.valid
+    rng = np.random.default_rng(random.getrandbits(64))
+
+    strides = np.array(player.strides)
+    initial = np.array(player.initial)
+    action_pile = np.array([i for i, _ in player.actions])
+    action_count = np.array([j for _, j in player.actions])
+
+    batch = max(1, min(batch, n))
+    games = np.arange(batch)
+    piles = np.tile(initial, (batch, 1))
+    turn = np.zeros(batch, dtype=int)
+    active = np.ones(batch, dtype=bool)
+    started = batch
+    finished = 0
+
+    # Last state and action of each player in each game, or -1
+    last_state = np.full((2, batch), -1)
+    last_action = np.full((2, batch), -1)
+
+    while finished < n:
+        g = games[active]
+        state = piles[g] @ strides
+
+        # Choose greedy actions, or uniformly random available ones
+        greedy = np.where(valid[state], q[state], -math.inf).argmax(axis=1)
+        explore = rng.random(len(g)) < player.epsilon
+        noise = rng.random((len(g), len(player.actions))) * valid[state]
+        action = np.where(explore, noise.argmax(axis=1), greedy)
+
+        mover = turn[g]
+        last_state[mover, g] = state
+        last_action[mover, g] = action
+
+        # Make moves
+        piles[g, action_pile[action]] -= action_count[action]
+        new_state = piles[g] @ strides
+        over = new_state == 0
+        other = 1 - mover
+
+        # The mover lost any game that just ended, and the other player won
+        future = np.where(
+            over, 0, q[new_state].max(axis=1, where=valid[new_state],
+                                      initial=-math.inf)
+        )
+        rows = [state[over]]
+        columns = [action[over]]
+        targets = [np.full(np.count_nonzero(over), -1.0)]
+
+        previous = last_state[other, g] >= 0
+        rows.append(last_state[other, g][previous])
+        columns.append(last_action[other, g][previous])
+        targets.append(np.where(over, 1.0, future)[previous])
+
+        # Pairs updated by several games move toward their mean target
+        pairs = (np.concatenate(rows) * q.shape[1]
+                 + np.concatenate(columns))
+        pairs, slots, counts = np.unique(pairs, return_inverse=True,
+                                         return_counts=True)
+        target = np.bincount(slots, np.concatenate(targets)) / counts
+        old = q.flat[pairs]
+        q.flat[pairs] = old + player.alpha * (target - old)
+
+        # Start new games in place of finished ones, while any are left
+        turn[g] = other
+        done = g[over]
+        for _ in range(len(done)):
+            finished += 1
+            if finished % interval == 0 or finished == n:
+                print(f"Finished {finished} of {n} training games")
+        restart = done[:max(0, n - started)]
+        active[done[len(restart):]] = False
+        started += len(restart)
+        piles[restart] = initial
+        turn[restart] = 0
+        last_state[:, restart] = -1
+        last_action[:, restart] = -1
+
+    print("Done training")
+    return player
+
+
 def play(ai, human_player=None):
     """
     Play human game against the AI.
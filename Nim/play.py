@@ -1,4 +1,30 @@
-from nim import train, play
+import argparse
+import os
 
-ai = train(10000)
+from nim import ArrayNimAI, train, train_batch, play
+
+parser = argparse.ArgumentParser(description="Play Nim against a trained AI.")
+parser.add_argument("--model",
+                    help="load the AI from this file, training and "
+                         "saving it there first if it does not exist")
+parser.add_argument("--games", type=int, default=10000,
+                    help="number of training games")
+parser.add_argument("--retrain", action="store_true",
+                    help="train a new AI even if the model file exists")
+parser.add_argument("--batch", type=int,
+                    help="train this many games at a time as arrays")
+args = parser.parse_args()
+
+if args.model and os.path.exists(args.model) and not args.retrain:
+    try:
+        ai = ArrayNimAI.load(args.model)
+    except ValueError as error:
+        parser.error(str(error))
+else:
+    if args.batch:
+        ai = train_batch(args.games, ArrayNimAI(), batch=args.batch)
+    else:
+        ai = train(args.games, ArrayNimAI())
+    if args.model:
+        ai.save(args.model)
 play(ai)
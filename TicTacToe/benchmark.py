@@ -0,0 +1,175 @@
+"""
+Search benchmark on a fixed suite of tic-tac-toe positions.
+
+Runs every engine on every position it can handle, from empty boards
+through midgames, and records the move, nodes visited, nodes per second,
+cache hit ratio and wall time. Each run starts from a cold cache. For the
+alpha-beta engines a cache hit is a lookup that answered a node without
+searching it; for MCTS, nodes are the tree nodes created and there is no
+cache.
+
+Usage: python benchmark.py [--depth D] [--iterations N] [--output F]
+"""
+
+import argparse
+import json
+import time
+
+import mcts
+import search
+import tictactoe as ttt
+
+# Name, win length and rows of each position, with "." for empty cells
+POSITIONS = [
+    ("3x3 empty", 3, ["...", "...", "..."]),
+    ("3x3 corner", 3, ["X..", "...", "..."]),
+    ("3x3 centre reply", 3, ["X..", ".O.", "..."]),
+    ("3x3 fork threat", 3, ["X..", ".O.", "..X"]),
+    ("3x3 midgame", 3, ["XO.", ".X.", "O.."]),
+    ("4x4 empty", 4, ["....", "....", "....", "...."]),
+    ("4x4 opening", 4, ["X...", ".O..", "....", "...."]),
+    ("4x4 midgame", 4, ["XO..", ".XO.", "..X.", "O..."]),
+    ("7x7 opening", 5, [".......", ".......", "...X...", "...O...",
+                        ".......", ".......", "......."]),
+    ("7x7 midgame", 5, [".......", "..O....", "..XX...", "..XO...",
+                        "...O...", ".......", "......."]),
+    ("15x15 opening", 5, ["." * 15] * 7 + [".......X......."]
+     + ["." * 15] * 7)
+]
+
+# Largest number of empty cells the exact search is run on
+MAX_EXACT = 12
+
+
+def parse(rows):
+    """Returns the board for rows of "X", "O" and "." characters."""
+    symbols = {"X": ttt.X, "O": ttt.O, ".": ttt.EMPTY}
+    return [[symbols[cell] for cell in row] for row in rows]
+
+
+def fresh_search(board, k):
+    """Returns a new Search for the board size, and makes it the shared one."""
+    search.shared_search.cache_clear()
+    return search.searcher(len(board), len(board[0]), k)
+
+
+def run_exact(board, k, args):
+    """Solves the position with `tictactoe.search_move`."""
+    engine = fresh_search(board, k)
+    move = ttt.search_move(board, k)
+    return move, engine.nodes, engine.probes, engine.hits
+
+
+def run_table(board, k, args):
+    """Looks the position up with `tictactoe.minimax`, loading the table."""
+    ttt.table = None
+    return ttt.minimax(board, k), 0, 0, 0
+
+
+def run_fixed(board, k, args):
+    """Searches the position to a fixed depth with `Search.fixed`."""
+    engine = fresh_search(board, k)
+    cell, _ = engine.fixed(*ttt.encode(board), args.depth)
+    move = divmod(cell, len(board[0]))
+    return move, engine.nodes, engine.probes, engine.hits
+
+
+def run_deepening(board, k, args):
+    """Searches the position by iterative deepening under a time budget."""
+    engine = fresh_search(board, k)
+    cell, _ = engine.iterate(*ttt.encode(board), args.budget)
+    move = divmod(cell, len(board[0]))
+    return move, engine.nodes, engine.probes, engine.hits
+
+
+def run_mcts(board, k, args):
+    """Searches the position with Monte Carlo tree search."""
+    engine = mcts.MCTS(board, k=k, seed=0)
+    engine.run(iterations=args.iterations)
+    return engine.best(), engine.size, None, None
+
+
+ENGINES = {
+    "exact": run_exact,
+    "table": run_table,
+    "fixed": run_fixed,
+    "deepening": run_deepening,
+    "mcts": run_mcts
+}
+
+
+def applies(engine, board, k):
+    """Checks if an engine can handle a position in reasonable time."""
+    empty = sum(cell == ttt.EMPTY for row in board for cell in row)
+    if engine == "exact":
+        return empty <= MAX_EXACT
+    if engine == "table":
+        return len(board) == 3 and len(board[0]) == 3 and k == 3
+    return True
+
+
+def measure(engine, board, k, args):
+    """
+    Runs an engine on a position.
+    Returns a dict of the move and the statistics of the run.
+    """
+    start = time.perf_counter()
+    move, nodes, probes, hits = ENGINES[engine](board, k, args)
+    seconds = time.perf_counter() - start
+    return {
+        "move": list(move) if move is not None else None,
+        "nodes": nodes,
+        "seconds": seconds,
+        "nodes_per_second": nodes / seconds if seconds else None,
+        "cache_hit_ratio": hits / probes if probes else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES),
+                        choices=list(ENGINES))
+    parser.add_argument("--depth", type=int, default=4,
+                        help="depth for the fixed engine")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="seconds per move for the deepening engine")
+    parser.add_argument("--iterations", type=int, default=1000,
+                        help="iterations for the mcts engine; keep above "
+                             "the root moves of the largest board (224)")
+    parser.add_argument("--output", help="write results to a JSON file")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'position':<18} {'engine':<10} {'move':>8} {'nodes':>9} "
+          f"{'nodes/s':>9} {'hits':>6} {'seconds':>9}")
+    for name, k, rows_text in POSITIONS:
+        board = parse(rows_text)
+        for engine in args.engines:
+            if not applies(engine, board, k):
+                continue
+            row = {"position": name, "k": k, "engine": engine}
+            row.update(measure(engine, board, k, args))
+            rows.append(row)
+
+            move = "-" if row["move"] is None else tuple(row["move"])
+            rate = row["nodes_per_second"] or 0
+            hits = row["cache_hit_ratio"]
+            hits = "-" if hits is None else f"{hits:.2f}"
+            print(f"{name:<18} {engine:<10} {str(move):>8} "
+                  f"{row['nodes']:>9} {rate:>9.0f} {hits:>6} "
+                  f"{row['seconds']:>9.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "settings": {
+                    "depth": args.depth,
+                    "budget": args.budget,
+                    "iterations": args.iterations
+                },
+                "results": rows
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Builds the table of solved tic-tac-toe positions used by `minimax`.
+
+Every position reachable from the empty board is solved once, and its
+value and best move are written to one byte of TABLE_FILE at the board's
+base-3 index. See `tictactoe.load_table` for the format.
+
+Usage: python build_table.py
+"""
+
+import tictactoe as ttt
+
+
+def build():
+    """Returns the solved table as bytes."""
+    search = ttt.searcher()
+    solved = bytearray([255]) * 3 ** 9
+    frontier = [ttt.initial_state()]
+    while frontier:
+        board = frontier.pop()
+        board_index = ttt.index(board)
+        if solved[board_index] != 255:
+            continue
+
+        if ttt.terminal(board):
+            solved[board_index] = (ttt.utility(board) + 1) << 4 | 15
+            continue
+
+        value = search.value(*ttt.encode(board))
+        i, j = ttt.search_move(board)
+        solved[board_index] = (value + 1) << 4 | (3 * i + j)
+        for action in ttt.actions(board):
+            frontier.append(ttt.result(board, action))
+    return bytes(solved)
+
+
+def main():
+    solved = build()
+    with open(ttt.TABLE_FILE, "wb") as f:
+        f.write(solved)
+    reachable = sum(1 for entry in solved if entry != 255)
+    print(f"Wrote {reachable} positions to {ttt.TABLE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Monte Carlo tree search for tic-tac-toe boards of any size.
+
+Moves are chosen with UCT: each step down the tree takes the child with
+the best average result plus an exploration bonus for rarely tried moves.
+Nodes live in a pool of NumPy arrays indexed by node number, and the
+children of a node take consecutive slots, so a node is a few array
+entries rather than a Python object.
+
+Each new leaf is scored by a batch of random playouts run together as
+arrays. A playout fills the empty cells in a random order. The game ends
+when a player first completes a line, so for each line the time it is
+completed by one player is the latest of its cells' times. The winner is
+the player with the earliest such time.
+"""
+
+import time
+
+import numpy as np
+
+import tictactoe as ttt
+from search import lines, lines_through
+
+# Outcomes of a finished position, stored per node
+OPEN = 0
+WON = 1
+DRAW = 2
+
+
+class MCTS():
+    """
+    Monte Carlo tree search from one position. Call `run` to search and
+    `best` for the most visited move.
+
+    Node values are from the point of view of the player who made the
+    move leading to the node: a win counts 1 and a draw 1/2.
+    """
+
+    def __init__(self, board, k=3, exploration=1.4, batch=32, seed=None):
+        self.height = len(board)
+        self.width = len(board[0])
+        self.cells = self.height * self.width
+        self.full = (1 << self.cells) - 1
+        self.through = lines_through(self.height, self.width, k)
+        self.exploration = exploration
+        self.batch = batch
+        self.rng = np.random.default_rng(seed)
+        self.x, self.o = ttt.encode(board)
+
+        # Cells of each line, one row per line
+        self.line_cells = np.array([
+            [cell for cell in range(self.cells) if line >> cell & 1]
+            for line in lines(self.height, self.width, k)
+        ]).reshape(-1, k)
+
+        # Node pool; node 0 is the root
+        capacity = 1024
+        self.parent = np.zeros(capacity, dtype=np.int32)
+        self.move = np.zeros(capacity, dtype=np.int32)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.child_count = np.zeros(capacity, dtype=np.int32)
+        self.outcome = np.zeros(capacity, dtype=np.int8)
+        self.visits = np.zeros(capacity, dtype=np.float64)
+        self.wins = np.zeros(capacity, dtype=np.float64)
+        self.size = 1
+        self.parent[0] = -1
+        self.move[0] = -1
+
+        self.iterations = 0
+        self.playouts = 0
+
+    def grow(self, needed):
+        """Makes room in the node pool for `needed` more nodes."""
+        capacity = len(self.parent)
+        if self.size + needed <= capacity:
+            return
+        while capacity < self.size + needed:
+            capacity *= 2
+        for name in ("parent", "move", "first_child", "child_count",
+                     "outcome", "visits", "wins"):
+            old = getattr(self, name)
+            new = np.full(capacity, -1 if name == "first_child" else 0,
+                          dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def expand(self, node, x, o):
+        """Adds a child to `node` for every empty cell of (x, o)."""
+        turn = x.bit_count() == o.bit_count()
+        empty = [cell for cell in range(self.cells)
+                 if not (x | o) >> cell & 1]
+        self.grow(len(empty))
+        first = self.size
+        self.size += len(empty)
+        self.first_child[node] = first
+        self.child_count[node] = len(empty)
+        for offset, cell in enumerate(empty):
+            child = first + offset
+            bit = 1 << cell
+            player = (x if turn else o) | bit
+            self.parent[child] = node
+            self.move[child] = cell
+            if any(player & line == line for line in self.through[cell]):
+                self.outcome[child] = WON
+            elif x | o | bit == self.full:
+                self.outcome[child] = DRAW
+
+    def select(self, node):
+        """
+        Returns a random unvisited child of `node`, or else the child
+        with the best UCT score.
+        """
+        first = self.first_child[node]
+        children = slice(first, first + self.child_count[node])
+        visits = self.visits[children]
+        unvisited = np.flatnonzero(visits == 0)
+        if len(unvisited):
+            return first + int(self.rng.choice(unvisited))
+        scores = (self.wins[children] / visits + self.exploration
+                  * np.sqrt(np.log(self.visits[node]) / visits))
+        return first + int(np.argmax(scores))
+
+    def playouts_from(self, x, o):
+        """
+        Plays `batch` random games from a position that is not over.
+        Returns how many X won, how many O won, and how many were drawn.
+        """
+        batch = self.batch
+        stones = x | o
+        empty = np.array([cell for cell in range(self.cells)
+                          if not stones >> cell & 1])
+
+        # Time at which each cell is played, or -1 if already played
+        order = self.rng.permuted(np.tile(empty, (batch, 1)), axis=1)
+        times = np.full((batch, self.cells), -1, dtype=np.int32)
+        np.put_along_axis(
+            times, order,
+            np.broadcast_to(np.arange(len(empty), dtype=np.int32),
+                            order.shape),
+            axis=1
+        )
+
+        # Owner of each cell: 0 for X, 1 for O
+        stone_owner = np.array([1 if o >> cell & 1 else 0
+                                for cell in range(self.cells)])
+        offset = 0 if x.bit_count() == o.bit_count() else 1
+        owner = np.where(times >= 0, (times + offset) & 1, stone_owner)
+
+        # When each line is completed, by whichever player owns all of it
+        line_times = times[:, self.line_cells].max(axis=2)
+        line_owner = owner[:, self.line_cells]
+        never = len(empty)
+        x_time = np.where((line_owner == 0).all(axis=2), line_times,
+                          never).min(axis=1)
+        o_time = np.where((line_owner == 1).all(axis=2), line_times,
+                          never).min(axis=1)
+
+        x_wins = int(np.count_nonzero(x_time < o_time))
+        o_wins = int(np.count_nonzero(o_time < x_time))
+        return x_wins, o_wins, batch - x_wins - o_wins
+
+    def iterate(self):
+        """Runs one selection, expansion, playout batch and update."""
+        node = 0
+        x, o = self.x, self.o
+        while self.first_child[node] >= 0 and self.outcome[node] == OPEN:
+            node = self.select(node)
+            bit = 1 << int(self.move[node])
+            if x.bit_count() == o.bit_count():
+                x |= bit
+            else:
+                o |= bit
+
+        # Results for the player who moved into the leaf
+        games = self.batch
+        mover_is_x = x.bit_count() != o.bit_count()
+        if self.outcome[node] == WON:
+            wins = games
+        elif self.outcome[node] == DRAW:
+            wins = games / 2
+        else:
+            self.expand(node, x, o)
+            x_wins, o_wins, draws = self.playouts_from(x, o)
+            wins = (x_wins if mover_is_x else o_wins) + draws / 2
+            self.playouts += games
+
+        # Alternate the point of view on the way back up
+        while node >= 0:
+            self.visits[node] += games
+            self.wins[node] += wins
+            wins = games - wins
+            node = self.parent[node]
+        self.iterations += 1
+
+    def run(self, iterations=None, budget=None):
+        """
+        Searches until `iterations` iterations are done or `budget`
+        seconds have passed, whichever comes first. With neither, runs
+        1000 iterations.
+        """
+        if iterations is None and budget is None:
+            iterations = 1000
+        deadline = None if budget is None else time.perf_counter() + budget
+        done = 0
+        while iterations is None or done < iterations:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            self.iterate()
+            done += 1
+
+    def best(self):
+        """
+        Returns the most visited move from the root as (i, j), breaking
+        ties by the best average result.
+        """
+        first = self.first_child[0]
+        if first < 0:
+            return None
+        children = slice(first, first + self.child_count[0])
+        visits = self.visits[children]
+        means = np.divide(self.wins[children], visits,
+                          out=np.zeros_like(visits), where=visits > 0)
+        child = first + int(np.lexsort((means, visits))[-1])
+        return divmod(int(self.move[child]), self.width)
+
+
+def mcts_move(board, k=3, iterations=None, budget=None, batch=32,
+              seed=None):
+    """
+    Returns the action for the current player chosen by Monte Carlo tree
+    search, or None if the game is over.
+    """
+    if ttt.terminal(board, k):
+        return None
+    search = MCTS(board, k=k, batch=batch, seed=seed)
+    search.run(iterations, budget)
+    return search.best()
@@ -0,0 +1,170 @@
+"""
+Root-parallel tic-tac-toe search.
+
+The moves at the root are split across a process pool, one task per move.
+Each worker process keeps its own Search, and so its own cache, between
+tasks. The first move in the sequential root order is searched with a full
+window. The others are searched in parallel with a window narrowed to
+values better than the first, so a move that is no better fails fast.
+The results are combined in root order, keeping the first move with the
+best value.
+
+In depth-limited search the workers reuse cached results only at the same
+depth (see `Search`), so that a value does not depend on which process
+searched it. The move is then the one a `same_depth` sequential search
+chooses.
+
+Usage: python parallel.py [--height H] [--width W] [-k K] [--depth D]
+"""
+
+import argparse
+import os
+import random
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import tictactoe as ttt
+from search import WIN, searcher
+
+
+def evaluate(height, width, k, x, o, bit, depth, score, alpha, beta):
+    """
+    Returns the value of playing `bit` in position (x, o): the exact value
+    if `depth` is None, and otherwise the value searched to `depth`.
+    Values outside the window from `alpha` to `beta` are bounds, as in
+    `Search.value`.
+    """
+    if depth is None:
+        search = searcher(height, width, k)
+        if x.bit_count() == o.bit_count():
+            return search.value(x | bit, o, alpha, beta)
+        return search.value(x, o | bit, alpha, beta)
+    search = searcher(height, width, k, same_depth=True)
+    return search.child_value(x, o, bit, depth, score, alpha, beta)
+
+
+def best(values, maximizing):
+    """Returns the index of the first best value."""
+    choose = max if maximizing else min
+    return values.index(choose(values))
+
+
+def parallel_move(board, k=3, depth=None, workers=None, executor=None):
+    """
+    Returns the action for the current player on a board that is not
+    over, searching the root moves in parallel.
+
+    Without a `depth`, every move is solved exactly and the action is the
+    one `tictactoe.search_move` returns. With a `depth`, it is the one
+    `Search.fixed` returns at that depth on a `same_depth` Search. Uses
+    `executor` if given, or else a new pool of `workers` processes.
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return parallel_move(board, k, depth, executor=pool)
+
+    height, width = len(board), len(board[0])
+    search = searcher(height, width, k)
+    x, o = ttt.encode(board)
+    maximizing = ttt.player(board) == ttt.X
+
+    if depth is None:
+        score = 0
+        low, high = -2, 2
+        bits = [1 << (i * width + j) for i, j in ttt.actions(board)]
+    else:
+        score = search.evaluate(x, o)
+        low, high = -2 * WIN, 2 * WIN
+        bits = search.root_order(x, o, score)
+
+    position = (height, width, k, x, o)
+    first = executor.submit(evaluate, *position, bits[0], depth, score,
+                            low, high).result()
+
+    # Nothing beats a solved win
+    if depth is None and first == (1 if maximizing else -1):
+        return divmod(bits[0].bit_length() - 1, width)
+
+    # Other moves only matter if they are strictly better than the first,
+    # and values that are no better never beat it in `best`
+    if maximizing:
+        low = first
+    else:
+        high = first
+    tasks = [position + (bit, depth, score, low, high) for bit in bits[1:]]
+    values = [first] + list(executor.map(evaluate, *zip(*tasks)))
+
+    return divmod(bits[best(values, maximizing)].bit_length() - 1, width)
+
+
+def sequential_move(board, k=3, depth=None, same_depth=False):
+    """Returns the action the sequential search chooses."""
+    if depth is None:
+        return ttt.search_move(board, k)
+    width = len(board[0])
+    search = searcher(len(board), width, k, same_depth)
+    cell, _ = search.fixed(*ttt.encode(board), depth)
+    return divmod(cell, width)
+
+
+def random_board(height, width, k, moves, rng):
+    """Returns a board after `moves` random moves that do not end it."""
+    while True:
+        board = ttt.initial_state(height, width)
+        for _ in range(moves):
+            board = ttt.result(board, rng.choice(sorted(ttt.actions(board))))
+            if ttt.terminal(board, k):
+                break
+        else:
+            return board
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--height", type=int, default=4)
+    parser.add_argument("--width", type=int, default=4)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=None,
+                        help="search depth (default: solve exactly)")
+    parser.add_argument("--moves", type=int, default=4,
+                        help="random moves played before searching")
+    parser.add_argument("--positions", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    boards = [random_board(args.height, args.width, args.k, args.moves, rng)
+              for _ in range(args.positions)]
+
+    # Each run starts from cold caches in fresh processes. The shared
+    # Search is the sequential baseline the game uses; the parallel moves
+    # must match a same_depth sequential search
+    timings = dict()
+    for same_depth in (False, True):
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            expected = list(pool.map(sequential_move, boards,
+                                     [args.k] * len(boards),
+                                     [args.depth] * len(boards),
+                                     [same_depth] * len(boards)))
+        timings[same_depth] = time.perf_counter() - start
+    sequential = timings[False]
+    print(f"sequential: {sequential:.2f}s, "
+          f"same depth only: {timings[True]:.2f}s")
+
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            moves = [parallel_move(board, args.k, args.depth, executor=pool)
+                     for board in boards]
+        elapsed = time.perf_counter() - start
+        if moves != expected:
+            raise Exception(f"{workers} workers chose different moves")
+        print(f"{workers:>3} workers: {elapsed:.2f}s, "
+              f"speedup {sequential / elapsed:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,59 @@
 import pygame
 import sys
+import threading
 import time
+import traceback
 
 import tictactoe as ttt
 
+# Board size, marks in a row needed to win, and AI time per move
+HEIGHT = 3
+WIDTH = 3
+K = 3
+BUDGET = 2.0
+
+
+class Worker():
+    """
+    Computes the AI's move on a background thread, so the window keeps
+    responding while it searches. `done` is set when the thread finishes,
+    with the exception in `error` if the search raised one.
+    """
+
+    def __init__(self, board):
+        self.move = None
+        self.error = None
+        self.done = False
+        self.depth = 0
+        self.nodes = 0
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(board,),
+                                       daemon=True)
+        self.thread.start()
+
+    def run(self, board):
+        try:
+            move = ttt.minimax(board, k=K, budget=BUDGET,
+                               stop=self.cancelled.is_set,
+                               progress=self.report)
+            if not self.cancelled.is_set():
+                self.move = move
+        except Exception as error:
+            traceback.print_exc()
+            self.error = error
+        finally:
+            self.done = True
+
+    def report(self, depth, cell, nodes):
+        self.depth = depth
+        self.nodes = nodes
+
+    def cancel(self):
+        """Stops the search and waits for the thread to finish."""
+        self.cancelled.set()
+        self.thread.join()
+
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -18,13 +68,15 @@ largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = ttt.initial_state(HEIGHT, WIDTH)
+worker = None
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if worker is not None:
+                worker.cancel()
             sys.exit()
 
     screen.fill(black)
@@ -67,13 +119,13 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_size = int(min(80, (width - 40) / WIDTH, (height - 150) / HEIGHT))
+        tile_origin = (width / 2 - (WIDTH / 2 * tile_size),
+                       height / 2 - (HEIGHT / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(HEIGHT):
             row = []
-            for j in range(3):
+            for j in range(WIDTH):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -83,24 +135,34 @@ while True:
 
                 if board[i][j] != ttt.EMPTY:
                     move = moveFont.render(board[i][j], True, white)
+                    if tile_size < 80:
+                        move = pygame.transform.smoothscale(
+                            move, (move.get_width() * tile_size // 80,
+                                   move.get_height() * tile_size // 80)
+                        )
                     moveRect = move.get_rect()
                     moveRect.center = rect.center
                     screen.blit(move, moveRect)
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
+        game_over = ttt.terminal(board, K)
         player = ttt.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = ttt.winner(board, K)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
                 title = f"Game Over: {winner} wins."
         elif user == player:
             title = f"Play as {user}"
+        elif worker is not None and worker.error is not None:
+            title = "Computer failed. Reset to play again."
+        elif worker is not None and worker.depth:
+            title = (f"Computer thinking... depth {worker.depth}, "
+                     f"{worker.nodes} nodes")
         else:
             title = f"Computer thinking..."
         title = largeFont.render(title, True, white)
@@ -108,39 +170,40 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Start the AI's search, and play its move once it is done
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if worker is None:
+                worker = Worker(board)
+            elif worker.done and worker.error is None:
+                board = ttt.result(board, worker.move)
+                worker = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(HEIGHT):
+                for j in range(WIDTH):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+        # Play again after the game, or reset during it
+        againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+        again = mediumFont.render("Play Again" if game_over else "Reset",
+                                  True, black)
+        againRect = again.get_rect()
+        againRect.center = againButton.center
+        pygame.draw.rect(screen, white, againButton)
+        screen.blit(again, againRect)
+        click, _, _ = pygame.mouse.get_pressed()
+        if click == 1:
+            mouse = pygame.mouse.get_pos()
+            if againButton.collidepoint(mouse):
+                time.sleep(0.2)
+                if worker is not None:
+                    worker.cancel()
+                    worker = None
+                user = None
+                board = ttt.initial_state(HEIGHT, WIDTH)
 
     pygame.display.flip()
@@ -0,0 +1,590 @@
+"""
+Tic-tac-toe search on bitboards.
+
+A position is a pair of integers (x, o): bit `i * width + j` of `x` is set
+if X has played cell (i, j), and likewise for `o`. Playing a move is a
+single bitwise or, and a win is found by testing the mover's bits against
+precomputed masks of the lines through the cell just played.
+
+Boards too large to solve are searched by iterative deepening under a
+time budget, scoring the positions at the search horizon with a heuristic.
+
+Run directly, it checks that the depth-limited cache stays bounded over a
+game: python search.py
+"""
+
+import functools
+import time
+
+# Flags for whether a cached value is exact, or a lower or upper bound
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Score of a won position in depth-limited search, above any heuristic
+WIN = 1 << 30
+
+# Entries in each generation of the depth-limited cache
+LIMITED_SIZE = 1 << 17
+
+
+class Timeout(Exception):
+    """Raised inside a search when its time budget runs out."""
+
+
+@functools.lru_cache(maxsize=None)
+def lines(height=3, width=3, k=3):
+    """
+    Returns the masks of every run of `k` cells in a row, column or
+    diagonal of a `height` by `width` board.
+    """
+    masks = []
+    for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for i in range(height):
+            for j in range(width):
+                end_i = i + di * (k - 1)
+                end_j = j + dj * (k - 1)
+                if not (0 <= end_i < height and 0 <= end_j < width):
+                    continue
+                mask = 0
+                for step in range(k):
+                    mask |= 1 << ((i + di * step) * width + j + dj * step)
+                masks.append(mask)
+    return masks
+
+
+@functools.lru_cache(maxsize=None)
+def lines_through(height=3, width=3, k=3):
+    """Returns, for each cell, the masks of the lines that contain it."""
+    masks = lines(height, width, k)
+    return [
+        [mask for mask in masks if mask >> cell & 1]
+        for cell in range(height * width)
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def symmetries(height=3, width=3):
+    """
+    Returns the rotations and reflections that map the board onto itself,
+    each as a permutation list giving the image of every cell. Square
+    boards have 8 of them; other boards have 4.
+    """
+    h = height - 1
+    w = width - 1
+    maps = [
+        lambda i, j: (i, j),
+        lambda i, j: (h - i, j),
+        lambda i, j: (i, w - j),
+        lambda i, j: (h - i, w - j)
+    ]
+    if height == width:
+        maps += [
+            lambda i, j: (j, i),
+            lambda i, j: (j, h - i),
+            lambda i, j: (w - j, i),
+            lambda i, j: (w - j, h - i)
+        ]
+
+    permutations = []
+    for transform in maps:
+        permutation = []
+        for cell in range(height * width):
+            i, j = transform(*divmod(cell, width))
+            permutation.append(i * width + j)
+        permutations.append(permutation)
+    return permutations
+
+
+@functools.lru_cache(maxsize=None)
+def permutation_tables(height=3, width=3):
+    """
+    Returns, for each symmetry, one 256-entry table per byte of a
+    bitboard, mapping the bits of that byte to their images. A board is
+    transformed by or-ing the table entries of each of its bytes.
+    """
+    cells = height * width
+    result = []
+    for permutation in symmetries(height, width):
+        tables = []
+        for start in range(0, cells, 8):
+            table = []
+            for byte in range(256):
+                mask = 0
+                for bit in range(min(8, cells - start)):
+                    if byte >> bit & 1:
+                        mask |= 1 << permutation[start + bit]
+                table.append(mask)
+            tables.append(table)
+        result.append(tables)
+    return result
+
+
+class Search():
+    """
+    Alpha-beta search for one board size, with a transposition table
+    that is kept between searches.
+
+    Values are from X's point of view: 1 if X wins, -1 if O wins and 0
+    for a draw. Positions are cached under the least key of their
+    rotations and reflections, so symmetric positions share one entry.
+
+    In depth-limited search, a cached result answers any search of the
+    same position to the same depth or less. With `same_depth`, it only
+    answers searches to exactly its depth, so that a position's value
+    does not depend on what was searched before it.
+    """
+
+    def __init__(self, height=3, width=3, k=3, same_depth=False):
+        self.height = height
+        self.width = width
+        self.cells = height * width
+        self.full = (1 << self.cells) - 1
+        self.lines = lines(height, width, k)
+        self.through = lines_through(height, width, k)
+
+        # Symmetries, their inverses and their bitboard tables
+        self.symmetries = symmetries(height, width)
+        self.inverses = [
+            [permutation.index(cell) for cell in range(self.cells)]
+            for permutation in self.symmetries
+        ]
+        self.tables = permutation_tables(height, width)
+
+        # Maps canonical keys to (value, flag, best move), with the move
+        # as a cell of the canonical orientation, or -1
+        self.cache = dict()
+
+        # Heuristic score of a line holding `c` stones of only one player
+        self.weights = [0] + [4 ** c for c in range(1, k)] + [0]
+
+        # Masks of the cells not in the first or the last column
+        first_column = sum(1 << (i * width) for i in range(height))
+        self.not_first = self.full & ~first_column
+        self.not_last = self.full & ~(first_column << (width - 1))
+
+        # Like `cache`, for depth-limited search, with the depth searched.
+        # Once `limited` holds `limit` entries it becomes `older` and the
+        # previous `older` is dropped, so memory stays bounded however
+        # long the Search is reused
+        self.limited = dict()
+        self.older = dict()
+        self.limit = LIMITED_SIZE
+        self.same_depth = same_depth
+
+        # Nodes searched, cache lookups and lookups that answered a node
+        self.nodes = 0
+        self.probes = 0
+        self.hits = 0
+
+        # The time by which a search must stop, and a function that
+        # returns True if it should stop early
+        self.deadline = None
+        self.stop = None
+
+    def canonical(self, x, o):
+        """
+        Returns the least key `x << cells | o` over all symmetries of a
+        position, and the index of the symmetry that gives it.
+        """
+        best = None
+        best_symmetry = 0
+        cells = self.cells
+        for symmetry, tables in enumerate(self.tables):
+            image_x = 0
+            image_o = 0
+            shift = 0
+            for table in tables:
+                image_x |= table[x >> shift & 255]
+                image_o |= table[o >> shift & 255]
+                shift += 8
+            key = image_x << cells | image_o
+            if best is None or key < best:
+                best = key
+                best_symmetry = symmetry
+        return best, best_symmetry
+
+    def winner(self, x, o):
+        """Returns 1 if X has a line, -1 if O has one, and 0 otherwise."""
+        for line in self.lines:
+            if x & line == line:
+                return 1
+            if o & line == line:
+                return -1
+        return 0
+
+    def value(self, x, o, alpha=-2, beta=2):
+        """
+        Returns the minimax value of a position if it lies strictly between
+        `alpha` and `beta`. Otherwise returns a bound on the side of the
+        window the value is on: at most `alpha`, or at least `beta`.
+        """
+        won = self.winner(x, o)
+        if won or x | o == self.full:
+            return won
+        return self.alphabeta(x, o, alpha, beta)
+
+    def alphabeta(self, x, o, alpha, beta):
+        """Searches a position that is not over; see `value`."""
+        self.nodes += 1
+        self.probes += 1
+        key, symmetry = self.canonical(x, o)
+        entry = self.cache.get(key)
+        first = -1
+        if entry is not None:
+            value, flag, first = entry
+            if (flag == EXACT
+                    or (flag == LOWER and value >= beta)
+                    or (flag == UPPER and value <= alpha)):
+                self.hits += 1
+                return value
+
+        # Try the cached best move first, in this orientation
+        empty = self.full & ~(x | o)
+        order = []
+        if first >= 0:
+            bit = 1 << self.inverses[symmetry][first]
+            order.append(bit)
+            empty ^= bit
+        while empty:
+            bit = empty & -empty
+            order.append(bit)
+            empty ^= bit
+
+        low, high = alpha, beta
+        full = self.full
+        through = self.through
+        best = -1
+        if x.bit_count() == o.bit_count():
+            value = -2
+            for bit in order:
+                child = x | bit
+                if any(child & line == line
+                       for line in through[bit.bit_length() - 1]):
+                    score = 1
+                elif child | o == full:
+                    score = 0
+                else:
+                    score = self.alphabeta(child, o, alpha, beta)
+                if score > value:
+                    value = score
+                    best = bit
+                alpha = max(alpha, value)
+                if alpha >= beta or value == 1:
+                    break
+        else:
+            value = 2
+            for bit in order:
+                child = o | bit
+                if any(child & line == line
+                       for line in through[bit.bit_length() - 1]):
+                    score = -1
+                elif x | child == full:
+                    score = 0
+                else:
+                    score = self.alphabeta(x, child, alpha, beta)
+                if score < value:
+                    value = score
+                    best = bit
+                beta = min(beta, value)
+                if alpha >= beta or value == -1:
+                    break
+
+        move = self.symmetries[symmetry][best.bit_length() - 1]
+        if value <= low:
+            self.cache[key] = (value, UPPER, move)
+        elif value >= high:
+            self.cache[key] = (value, LOWER, move)
+        else:
+            self.cache[key] = (value, EXACT, move)
+        return value
+
+    def line_score(self, x, o, line):
+        """Returns the heuristic score of one line, from X's view."""
+        if o & line == 0:
+            return self.weights[(x & line).bit_count()]
+        if x & line == 0:
+            return -self.weights[(o & line).bit_count()]
+        return 0
+
+    def evaluate(self, x, o):
+        """
+        Returns the heuristic score of a position from X's point of view:
+        lines open to only one player count for that player, more the more
+        of their stones they hold.
+        """
+        return sum(self.line_score(x, o, line) for line in self.lines)
+
+    def candidates(self, x, o):
+        """
+        Returns the mask of empty cells next to a stone, or the centre
+        cell of an empty board.
+        """
+        stones = x | o
+        if not stones:
+            return 1 << (self.height // 2 * self.width + self.width // 2)
+        near = (stones | (stones << 1 & self.not_first)
+                | (stones >> 1 & self.not_last))
+        near |= near << self.width | near >> self.width
+        return near & self.full & ~stones or self.full & ~stones
+
+    def play(self, x, o, bit, turn, score):
+        """
+        Plays `bit` for X if `turn` is true, or for O otherwise.
+        Returns the new position, its heuristic score and whether the
+        move completed a line.
+        """
+        line_score = self.line_score
+        won = False
+        before = x | o
+        if turn:
+            child_x, child_o = x | bit, o
+            player = child_x
+        else:
+            child_x, child_o = x, o | bit
+            player = child_o
+        for line in self.through[bit.bit_length() - 1]:
+            if player & line == line:
+                won = True
+            if before & line:
+                score -= line_score(x, o, line)
+            score += line_score(child_x, child_o, line)
+        return child_x, child_o, score, won
+
+    def ordered(self, moves, first):
+        """Returns the bits of `moves`, with `first` first if it is one."""
+        order = []
+        if first >= 0 and moves >> first & 1:
+            order.append(1 << first)
+            moves ^= 1 << first
+        while moves:
+            bit = moves & -moves
+            order.append(bit)
+            moves ^= bit
+        return order
+
+    def deepening(self, x, o, depth, alpha, beta, score):
+        """
+        Returns the value of a position that is not over, searching
+        `depth` moves ahead and scoring the horizon heuristically.
+        Values and bounds are as in `value`, on the scale of WIN.
+        """
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self.expired():
+            raise Timeout
+        if depth == 0:
+            return score
+
+        self.probes += 1
+        key, symmetry = self.canonical(x, o)
+        entry = self.limited.get(key)
+        if entry is None:
+            entry = self.older.get(key)
+        first = -1
+        if entry is not None:
+            entry_depth, value, flag, first = entry
+            first = self.inverses[symmetry][first]
+            usable = entry_depth == depth or (
+                entry_depth > depth and not self.same_depth
+            )
+            if usable and (
+                flag == EXACT
+                or (flag == LOWER and value >= beta)
+                or (flag == UPPER and value <= alpha)
+            ):
+                self.hits += 1
+                return value
+
+        low, high = alpha, beta
+        turn = x.bit_count() == o.bit_count()
+        value = -2 * WIN if turn else 2 * WIN
+        best = -1
+        for bit in self.ordered(self.candidates(x, o), first):
+            child_x, child_o, child_score, won = self.play(
+                x, o, bit, turn, score
+            )
+            if won:
+                child = WIN + depth if turn else -WIN - depth
+            elif child_x | child_o == self.full:
+                child = 0
+            else:
+                child = self.deepening(child_x, child_o, depth - 1,
+                                       alpha, beta, child_score)
+
+            if (turn and child > value) or (not turn and child < value):
+                value = child
+                best = bit
+            if turn:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if len(self.limited) >= self.limit:
+            self.older = self.limited
+            self.limited = dict()
+        move = self.symmetries[symmetry][best.bit_length() - 1]
+        if value <= low:
+            self.limited[key] = (depth, value, UPPER, move)
+        elif value >= high:
+            self.limited[key] = (depth, value, LOWER, move)
+        else:
+            self.limited[key] = (depth, value, EXACT, move)
+        return value
+
+    def expired(self):
+        """Checks if the current search is out of time or stopped."""
+        return ((self.deadline is not None
+                 and time.perf_counter() > self.deadline)
+                or (self.stop is not None and self.stop()))
+
+    def iterate(self, x, o, budget, max_depth=None, stop=None,
+                progress=None):
+        """
+        Searches a position that is not over one move deeper at a time
+        until `budget` seconds have passed, the value is a forced win or
+        loss, or the search reaches `max_depth` or the end of the game.
+
+        The search also ends early once `stop()` returns True. After each
+        completed depth, `progress(depth, cell, nodes)` is called with the
+        best cell so far and the nodes searched.
+
+        Returns the best cell found by the last completed search and its
+        value.
+        """
+        self.deadline = time.perf_counter() + budget
+        self.stop = stop
+        start_nodes = self.nodes
+        empty = (self.full & ~(x | o)).bit_count()
+        if max_depth is None or max_depth > empty:
+            max_depth = empty
+        score = self.evaluate(x, o)
+        order = self.root_order(x, o, score)
+
+        best_bit, best_value = order[0], score
+        try:
+            for depth in range(1, max_depth + 1):
+                value, bit = self.search_root(x, o, order, depth, score)
+                best_bit, best_value = bit, value
+                if progress is not None:
+                    progress(depth, bit.bit_length() - 1,
+                             self.nodes - start_nodes)
+                if abs(value) >= WIN:
+                    break
+
+                # Search the best move first at the next depth
+                order.remove(bit)
+                order.insert(0, bit)
+        except Timeout:
+            pass
+        finally:
+            self.deadline = None
+            self.stop = None
+        return best_bit.bit_length() - 1, best_value
+
+    def root_order(self, x, o, score):
+        """
+        Returns the root moves of a position as bits, ordered by how much
+        they improve the heuristic score for the player to move.
+        """
+        turn = x.bit_count() == o.bit_count()
+        moves = []
+        for bit in self.ordered(self.candidates(x, o), -1):
+            _, _, child_score, _ = self.play(x, o, bit, turn, score)
+            moves.append((child_score if turn else -child_score, bit))
+        moves.sort(key=lambda move: -move[0])
+        return [bit for _, bit in moves]
+
+    def fixed(self, x, o, depth):
+        """
+        Searches a position that is not over exactly `depth` moves ahead.
+        Returns the best cell and its value.
+        """
+        score = self.evaluate(x, o)
+        value, bit = self.search_root(x, o, self.root_order(x, o, score),
+                                      depth, score)
+        return bit.bit_length() - 1, value
+
+    def child_value(self, x, o, bit, depth, score, alpha=-2 * WIN,
+                    beta=2 * WIN):
+        """
+        Returns the value, searched to `depth`, of playing `bit` in a
+        position with heuristic score `score`. Bounds are as in `value`.
+        """
+        turn = x.bit_count() == o.bit_count()
+        child_x, child_o, child_score, won = self.play(x, o, bit, turn, score)
+        if won:
+            return WIN + depth if turn else -WIN - depth
+        if child_x | child_o == self.full:
+            return 0
+        return self.deepening(child_x, child_o, depth - 1, alpha, beta,
+                              child_score)
+
+    def search_root(self, x, o, order, depth, score):
+        """
+        Searches the root moves in `order` to `depth`.
+        Returns the best value and the first move in `order` that
+        reaches it.
+        """
+        turn = x.bit_count() == o.bit_count()
+        alpha, beta = -2 * WIN, 2 * WIN
+        best_value = None
+        best_bit = order[0]
+        for bit in order:
+            value = self.child_value(x, o, bit, depth, score, alpha, beta)
+            if best_value is None or (turn and value > best_value) or (
+                not turn and value < best_value
+            ):
+                best_value = value
+                best_bit = bit
+                if turn:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+        return best_value, best_bit
+
+
+def searcher(height=3, width=3, k=3, same_depth=False):
+    """
+    Returns the shared Search for one board size, so that its cache
+    persists from move to move. Every way of passing the same arguments
+    gives the same Search.
+    """
+    return shared_search(height, width, k, bool(same_depth))
+
+
+@functools.lru_cache(maxsize=None)
+def shared_search(height, width, k, same_depth):
+    """Returns the Search behind `searcher`, cached by all four arguments."""
+    return Search(height, width, k, same_depth)
+
+
+def check_cache_bound(moves=8, budget=0.25, limit=2000):
+    """
+    Plays `moves` moves on an empty 15x15 board, five in a row, each chosen
+    by a deepening search on one Search whose depth-limited cache holds
+    `limit` entries per generation, as the GUI reuses one Search.
+    Returns the number of entries held after each move, and raises an
+    exception if it ever exceeds the two generations allowed.
+    """
+    search = Search(15, 15, 5)
+    search.limit = limit
+    x, o = 0, 0
+    sizes = []
+    for _ in range(moves):
+        cell, _ = search.iterate(x, o, budget)
+        if x.bit_count() == o.bit_count():
+            x |= 1 << cell
+        else:
+            o |= 1 << cell
+        size = len(search.limited) + len(search.older)
+        if size > 2 * limit:
+            raise Exception(f"depth-limited cache grew to {size} entries")
+        sizes.append(size)
+    return sizes
+
+
+if __name__ == "__main__":
+    sizes = check_cache_bound()
+    print(f"depth-limited cache after each move: {sizes}")
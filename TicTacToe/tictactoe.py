@@ -3,52 +3,36 @@ Tic Tac Toe Player
 """
 
 import math
-import copy
+import os
+
+from search import lines, searcher
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Table of solved positions written by build_table.py
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "solved.bin")
+
+# Contents of TABLE_FILE once loaded, or False if it could not be read
+table = None
 
-def initial_state():
+
+def initial_state(height=3, width=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * width for _ in range(height)]
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    condition_empty = 1
-    
-    for row in board:
-        for cell in row:
-            if cell == X or cell == O:
-                condition_empty = 0
-    
-    if condition_empty == 1:
-        return X
-    
-    x_count = 0
-    y_count = 0
-
-    for row in board:
-        for cell in row:
-            if cell == X:
-                x_count += 1
-            if cell == O:
-                y_count += 1
-    
-    if x_count > y_count:
+    x, o = encode(board)
+    if x.bit_count() > o.bit_count():
         return O
-    
-    if y_count > x_count:
-        return X
-
     return X
 
 
@@ -58,8 +42,8 @@ def actions(board):
     """
     valid_actions = set()
     
-    for i in range (3):
-        for j in range (3):
+    for i in range (len(board)):
+        for j in range (len(board[i])):
             if board[i][j] == EMPTY:
                 valid_actions.add((i,j))
     
@@ -71,7 +55,7 @@ def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    copy_board = copy.deepcopy(board)
+    copy_board = [list(row) for row in board]
     
     if copy_board [action[0]][action[1]] == X or copy_board [action[0]][action[1]] == O:
         raise NameError;"Invalid Action"
@@ -81,58 +65,24 @@ def result(board, action):
 
     return copy_board
 
-def winner(board):
+def winner(board, k=3):
     """
-    Returns the winner of the game, if there is one.
+    Returns the winner of the game, if there is one: the player with `k`
+    marks in a row, column or diagonal.
     """
-    #Checking rows
-    for row in board:
-        if (row[0] == X and row[1] == X and row[2] == X):
+    x, o = encode(board)
+    for line in lines(len(board), len(board[0]), k):
+        if x & line == line:
             return X
-        if (row[0] == O and row[1] == O and row[2] == O):
+        if o & line == line:
             return O
-    
-    #Checking columns for X
-    if (board[0][0] == X and board[1][0] == X and board[2][0] == X):
-        return X
-
-    if (board[0][1] == X and board[1][1] == X and board[2][1] == X):
-        return X
-
-    if (board[0][2] == X and board[1][2] == X and board[2][2] == X):
-        return X
-    
-    #Checking columns for O
-    if (board[0][0] == O and board[1][0] == O and board[2][0] == O):
-        return O
-
-    if (board[0][1] == O and board[1][1] == O and board[2][1] == O):
-        return O
-
-    if (board[0][2] == O and board[1][2] == O and board[2][2] == O):
-        return O
-    
-    #Checking diagonals for X
-    if (board[0][0] == X and board[1][1] == X and board[2][2] == X):
-        return X
-
-    if (board[0][2] == X and board[1][1] == X and board[2][0] == X):
-        return X
-
-    #Checking diagonals for O
-    if (board[0][0] == O and board[1][1] == O and board[2][2] == O):
-        return O
-
-    if (board[0][2] == O and board[1][1] == O and board[2][0] == O):
-        return O
-    
     return None
 
-def terminal(board):
+def terminal(board, k=3):
     """
     Returns True if game is over, False otherwise.
     """
-    win_player = winner(board)
+    win_player = winner(board, k)
     if (win_player != None):
         return True
 
@@ -143,11 +93,11 @@ def terminal(board):
 
     return True
 
-def utility(board):
+def utility(board, k=3):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    win_player = winner(board)
+    win_player = winner(board, k)
     if (win_player == X):
         return 1
     
@@ -157,46 +107,136 @@ def utility(board):
     return 0
 
 
-def minimax(board):
+def encode(board):
     """
-    Returns the optimal action for the current player on the board.
+    Returns the board as a pair of bitboards (x, o), where bit
+    `i * width + j` is set if that player has played cell (i, j).
     """
-    if (terminal(board)):
-        return None
+    x = 0
+    o = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if cell == X:
+                x |= bit
+            elif cell == O:
+                o |= bit
+            bit <<= 1
+    return x, o
+
+
+def decode(x, o, height=3, width=3):
+    """
+    Returns the board represented by the bitboards `x` and `o`.
+    """
+    return [
+        [X if x >> (i * width + j) & 1 else O if o >> (i * width + j) & 1
+         else EMPTY for j in range(width)]
+        for i in range(height)
+    ]
+
 
-    if (player(board) == X):
-        maxu = -3
-        result_action = (3,3)
-        for action in actions(board):
-            if minimax_helper(result(board, action)) > maxu:
-                maxu = minimax_helper(result(board,action))
-                result_action = action
-        return result_action
-
-    elif (player(board) == O):
-        minu = 3
-        result_action = (3,3)
-        for action in actions(board):
-            if (minimax_helper(result(board, action)) < minu):
-                minu = minimax_helper(result(board, action))
-                result_action = action
-        return result_action
-
-def minimax_helper(board):
-    if (terminal(board)):
-        return utility(board)
-
-    if (player(board) == X):
-        maxu = -3
-        for action in actions(board):
-            if (minimax_helper(result(board, action)) > maxu):
-                maxu = minimax_helper(result(board, action))
-        return maxu
-
-    if (player(board) == O):
-        minu = 3
-        for action in actions(board):
-            if (minimax_helper(result(board, action)) < minu):
-                minu = minimax_helper(result(board, action))
-        return minu
+def index(board):
+    """
+    Returns the base-3 index of a 3x3 board, with each cell a digit:
+    0 if empty, 1 for X and 2 for O.
+    """
+    result_index = 0
+    for row in reversed(board):
+        for cell in reversed(row):
+            result_index = 3 * result_index + (
+                1 if cell == X else 2 if cell == O else 0
+            )
+    return result_index
+
+
+def load_table():
+    """
+    Returns the solved table, reading it from TABLE_FILE on first use.
+    Returns False if the file is missing or malformed.
+
+    The table holds one byte per board index: the low 4 bits are the
+    cell `3 * i + j` of the best move, or 15 if the game is over, and the
+    next 2 bits are the value of the board plus 1. Boards that cannot be
+    reached in a game are 255.
+    """
+    global table
+    if table is None:
+        try:
+            with open(TABLE_FILE, "rb") as f:
+                table = f.read()
+        except OSError:
+            table = False
+        if table and len(table) != 3 ** 9:
+            table = False
+    return table
+
+
+def minimax(board, k=3, budget=None, stop=None, progress=None):
+    """
+    Returns the optimal action for the current player on the board, for
+    a game won by `k` in a row.
+
+    Standard boards are looked up in the solved table. Without a
+    `budget`, other boards are solved exactly with `search_move`, which
+    is only feasible for small boards. With a `budget` in seconds, the
+    best action found by iterative deepening in that time is returned;
+    `stop` and `progress` are passed on to `Search.iterate`.
+    """
+    if (terminal(board, k)):
+        return None
 
+    height, width = len(board), len(board[0])
+    if height == 3 and width == 3 and k == 3:
+        solved = load_table()
+        if solved:
+            entry = solved[index(board)]
+            if entry != 255 and entry & 15 < 9:
+                return divmod(entry & 15, 3)
+
+    if budget is None:
+        return search_move(board, k)
+
+    x, o = encode(board)
+    cell, _ = searcher(height, width, k).iterate(x, o, budget, stop=stop,
+                                                 progress=progress)
+    return divmod(cell, width)
+
+
+def search_move(board, k=3):
+    """
+    Returns the optimal action for the current player on a board that is
+    not over, by searching.
+
+    Actions are tried in the order `actions` returns them, and the first
+    one with the best value is chosen.
+    """
+    width = len(board[0])
+    search = searcher(len(board), width, k)
+    x, o = encode(board)
+    maximizing = player(board) == X
+    best_value = None
+    result_action = None
+    for action in actions(board):
+        bit = 1 << (action[0] * width + action[1])
+        child = (x | bit, o) if maximizing else (x, o | bit)
+
+        # Later actions only matter if they are strictly better
+        if best_value is None:
+            value = search.value(*child)
+        elif maximizing:
+            value = search.value(*child, alpha=best_value)
+        else:
+            value = search.value(*child, beta=best_value)
+
+        if (best_value is None
+                or (maximizing and value > best_value)
+                or (not maximizing and value < best_value)):
+            best_value = value
+            result_action = action
+
+        # Nothing beats a win
+        if best_value == (1 if maximizing else -1):
+            break
+
+    return result_action